@@ -4,186 +4,16 @@ This the file that has the code for generating the features from the bytes in fi
 
 
 from bif_lakshay import *
-import matplotlib.pyplot as plt
-from scipy.fft import rfft, rfftfreq
-from scipy.fft import irfft
+from nebby import pipeline
+from nebby.pipeline import plot_d, get_features, get_time_features
 
-def get_window(f,p,t=1):
-    algo_cc = f
-#     flows = process_flows(algo_cc, "./Nebby/measurements/",p=p)    
-    # flows = process_flows(algo_cc, "./Nebby/measurements-new-btl/50-200-2-60/",p=p)
-#     flows = process_flows(algo_cc, "./Nebby/measurements-100-150/",p=p)
-    from globals_lakshay import PATH
-    flows = process_flows(algo_cc, PATH ,p=p)
-    params = algo_cc.split("-")
-    data = []
-    time = []
-    drops = []
-    retrans = []
-    OOA = []
-    DA = []
-    use_port = 0
-    maxx = 0
-    # print("All Ports : ", flows.keys())
-    for port in flows.keys():
-        if len(flows[port]['windows']) > maxx:
-            maxx = len(flows[port]['windows'])
-            use_port = port
-    # print("Port Selected",use_port)
-    data = flows[use_port]['windows']
-    time = flows[use_port]['times']
-    retrans = flows[use_port]['retrans']
-    OOA = flows[use_port]['OOA']
-    DA = flows[use_port]['DA']
-#     time_index = len(time)-1
-#     for index in range(len(flows[use_port]['times'])-1):
-#         if flows[use_port]['times'][index+1] - flows[use_port]['times'][index] > :
-#             time_index = index
-#     time_last = flows[use_port]['times'][time_index]
-#     data = data[:time_index+1]
-#     time = time[:time_index+1]
-    if t==2:
-        return data, time, retrans, OOA, DA
-    if t==1:
-        return data, time, retrans
-
-def plot_d(ax, time, data, c, l, alpha=1):
-    ax.plot(time, data, color=c, lw=2, label = l,alpha=alpha)
-
-
-def get_fft(data):
-    n = len(data)
-    data_step = 0.002
-    yf = rfft(data)
-    xf = rfftfreq(n,data_step)
-    return yf,xf
-
-def get_fft_smoothening(data, time, ax,rtt,p):
-    rtt=rtt
-    yf, xf = get_fft(data)
-    thresh  = (1/rtt)
-    thresh_ind = 0
-    for i in range(len(xf)) :
-        freq = xf[i]
-        if(freq > thresh):
-            thresh_ind = i
-            break
-            
-    yf_clean = yf
-    yf_clean[thresh_ind+1:] = 0
-    new_f_clean = irfft(yf_clean)
-    start_len = len(time) - len(new_f_clean)
-
-    plot_data = new_f_clean
-    
-    if p=="y":
-        ax.plot(time[start_len:], plot_data, 'k', label='FFT smoothening', linewidth=1.5, alpha=0.5)
-    plot_time = time[start_len:] 
-    return plot_time, plot_data
-
-def smoothen(time, data, rtt):
-    # Smoothening 
-    left = 0
-    right = 0
-    run_sum = 0
-    avg_data = []
-    new_time = []
-    roll_time = time
-    roll_data = data
-    while right < len(roll_time):
-        while(right < len(roll_time) and (roll_time[right]-roll_time[left] < 2*rtt)):
-            run_sum+=roll_data[right]
-            right+=1
-        new_time.append(float(roll_time[right-1]+roll_time[left])/2)
-        avg_data.append(float(run_sum)/(right-left))
-        run_sum-=roll_data[left]
-        left+=1
-    return new_time, avg_data
+# The traces are read from globals_lakshay.PATH when these are called, not when they are imported
 
+def get_window(f,p,t=1):
+    return pipeline.get_window(f, p, t, path=globals_lakshay.PATH)
 
 def plot_one_bt(f, p,t=1):
-    fs = f.split("-")
-    # Handle case when filename doesn't have enough segments
-    if len(fs) < 4:
-        print(f"Warning: Filename '{f}' doesn't follow expected format.")
-        print("Using default values: predelay=0, postdelay=50")
-        pre = 0
-        post = 50
-    else:
-        pre = int(fs[2])
-        post = int(fs[3])
-    rtt = float(((pre+post)*2))/1000
-    ax = 0
-    if t==1:
-        data, time, retrans = get_window(f,"n",t)
-    elif t==2:
-        data, time, retrans, OOA, DA = get_window(f,"n",t)
-    
-    if p == 'y':
-        fig, ax = plt.subplots(1,1, figsize=(15,8))
-        for t in retrans :
-            plt.axvline(x = t, color = 'm',alpha=0.5)
-        if t == 2:
-            for t in OOA :
-                plt.axvline(x = t, color = 'k', lw=2)
-            for t in DA:
-                plt.axvline(x = t, color = 'g', lw=0.5, alpha = 0.5)
-        plot_d(ax,time,data, "r","Original")
-    time, data = get_fft_smoothening(data, time, ax,rtt,p)
-    
-    #         plot_d(ax,time,data,"b","FFT Smoothened" )
-#         print(len(time), len(data))
-    time, data = smoothen(time, data, rtt)
-#         print(len(time), len(data))
-    if p == 'y':
-        plot_d(ax, time, data, "b", "Smoothened",alpha=0.5)
-        ax.legend()
-#             plt.savefig("./plots/"+f+".png")
-        plt.show()
-#     return time, data, grad_time, grad_data, rtt
-#     print("Black : OOA, Green : DA, Magenta : RP")
-    return time, data, retrans, rtt 
-
-
-def get_features(time, features):
-    left = 0
-    right = 0
-    feature_index = 0
-    in_feature = 0
-    index_features = []
-    while right < len(time) and feature_index < len(features): 
-        if in_feature == 0 and time[right]>=features[feature_index][0]:
-            in_feature = 1
-            left = right
-        elif in_feature == 1 and time[right] > features[feature_index][1]:
-            in_feature = 0
-            index_features.append([left, right-1])
-            feature_index+=1
-        right+=1
-    if in_feature == 1:
-        index_features.append([left, right-1])
-    return index_features
-
-def get_time_features(retrans,time,rtt):
-    time_thresh = 20*rtt
-    features = []
-    for i in range(1, len(retrans)):
-        if retrans[i]-retrans[i-1] >= time_thresh:
-            features.append([retrans[i-1], retrans[i]])
-    # add a feature that finished when the experiment ends
-    features.append([retrans[-1],time[-1]])
-    return features
+    return pipeline.plot_one_bt(f, p, t, path=globals_lakshay.PATH)
 
 def get_plot_features(curr_file, p):
-    time, data, retrans, rtt = plot_one_bt(curr_file,p=p,t=1)
-    time_features = get_time_features(retrans,time, rtt)
-    features = get_features(time,time_features)    
-    if p == 'y':
-        fig, ax = plt.subplots(1,1, figsize=(15,8))
-        plot_d(ax, time, data, "b", "Smoothened")
-        for ft in features : 
-#             print(time[ft[1]]-time[ft[0]])
-            ax.plot(time[ft[0]:ft[1]+1], data[ft[0]:ft[1]+1], color = 'r')
-        plt.show()
-    return time, data, features
-
+    return pipeline.get_plot_features(curr_file, p, path=globals_lakshay.PATH)
@@ -14,13 +14,11 @@ import sys
 import os
 import json
 import matplotlib.pyplot as plt
-import numpy as np
 
 # Import Nebby's existing functions
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 try:
-    from bif_lakshay import process_flows
-    from features_lakshay import plot_one_bt, get_window
+    from nebby.flows import process_flows
     print("Successfully imported Nebby modules")
 except ImportError as e:
     print(f"Error importing Nebby modules: {e}")
@@ -0,0 +1,8 @@
+'''
+Shared analysis engine for the Nebby scripts.
+
+The scripts in analysis/, analysis/final/ and analysis/websites/ import the
+stages they need from here instead of carrying their own copies,
+nebby.pipeline chains them from a trace to its fitted features and the BBR
+check the way the scripts run them.
+'''
@@ -0,0 +1,46 @@
+'''
+One command line for the classification scripts and the nebby tools.
+
+Usage:
+python3 -m nebby file file_path [y|n]
+    final/check_cc_file.py
+python3 -m nebby folder folder_path output_file_name [--jobs N]
+    final/check_cc_folder.py
+python3 -m nebby website file_path
+    websites/test_website.py
+python3 -m nebby bench|cache|fit|model|score|serve|store|train ...
+    python3 -m nebby.<tool>
+
+Run from analysis/ (or with it on PYTHONPATH), from any folder: the
+scripts use the models next to them unless NEBBY_MODEL_DIR is set. Nothing
+but numpy and the nebby modules is imported up front, matplotlib, pandas,
+scipy and sklearn only on the paths that use them (see nebby.lazy), and
+python3 -m nebby.bench imports checks that against a budget.
+'''
+
+import os
+import sys
+import runpy
+
+ANALYSIS = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPTS = {"file": "final/check_cc_file.py", "folder": "final/check_cc_folder.py",
+           "website": "websites/test_website.py"}
+TOOLS = ["bench", "cache", "fit", "model", "score", "serve", "store", "train"]
+
+
+def main(argv):
+    if len(argv) == 0 or (argv[0] not in SCRIPTS and argv[0] not in TOOLS):
+        print(__doc__[__doc__.find("Usage"):])
+        return
+    command = argv[0]
+    if command in TOOLS:
+        sys.argv = ["nebby." + command] + argv[1:]
+        runpy.run_module("nebby." + command, run_name="__main__", alter_sys=True)
+        return
+    script = os.path.join(ANALYSIS, SCRIPTS[command])
+    sys.argv = [script] + argv[1:]
+    runpy.run_path(script, run_name="__main__")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,241 @@
+'''
+Detection of the bandwidth probes of BBR in the smoothened bif trace.
+
+getProbes slides a window of `thresh` seconds over the trace and keeps the
+windows that look like a probe: a peak in the middle, both ends at about the
+same level, a steep enough maximum and a stable trace on either side. After
+a probe the search continues from its right end.
+
+The window of every start is found for all starts at once and the cheap
+tests (peak in the middle, ends close, steep maximum) are done with array
+operations, the maximum of every window comes from a sparse table. Only the
+starts that pass them are checked one by one like the old loop did (kept as
+getProbes_loop), so the probes found are exactly the same.
+
+isBBR takes the highest point of every probe and calls the trace BBR when
+two gaps in a row between those peaks fall inside the probing period
+(between l and r RTTs for the BDP of the trace).
+
+The window and the probing period are given in RTTs at a BDP of REF_BDP
+(200 kbps and a 100 ms rtt, like the web traces) and scale with the BDP of
+the trace, so any bandwidth and rtt has thresholds. The smaller the BDP,
+the fewer packets a probe (a quarter of the BDP) is and the more RTTs it
+takes to stand out: the window grows as REF_BDP/bdp, so it always spans
+the same number of bytes, and the probing period as sqrt(REF_BDP/bdp).
+The thresholds and both exponents were fitted on the sensitivity runs
+(BDPs of 250 to 5000 bytes) with 15, 35 and 95 ms delays and checked on
+the held out 25 and 45 ms ones (python3 -m nebby.bench bbr sensitivity/,
+which fails when the detection falls below the rates required there).
+'''
+
+import math
+import bisect
+import numpy as np
+
+from nebby.smooth import window_ends
+
+# the BDP (bytes) the thresholds below are for
+REF_BDP = 2500
+# window in RTTs, max std of the sides, max difference of the ends, min peak ratio
+probe_params = (6, 0.025, 0.02, 1.10)
+# range of the gap between two probes, in RTTs
+peak_range = (10, 25)
+# the window and the range in RTTs grow as (REF_BDP/bdp)**exponent for a smaller BDP
+WINDOW_EXP = 1
+PERIOD_EXP = 0.5
+
+
+def get_scale(rtt, bw):
+    # REF_BDP over the BDP of a path of rtt seconds and bw kbps
+    return REF_BDP/(bw*1000*rtt/8)
+
+
+def get_params(rtt, bw):
+    windows, st_thresh, error, alpha = probe_params
+    return windows*get_scale(rtt, bw)**WINDOW_EXP, st_thresh, error, alpha
+
+
+def get_peak_range(rtt, bw):
+    scale = get_scale(rtt, bw)**PERIOD_EXP
+    return peak_range[0]*scale, peak_range[1]*scale
+
+
+def getProbes_loop(time, data, rtt, bdp, bw=200):
+    windows, st_thresh, error, alpha = get_params(rtt, bw)
+    thresh = windows*rtt
+    probe_index = []
+    left = 0
+    right = 0
+    bdp_thresh = bdp/2
+    end = 0
+    while right < len(data):
+        while right < len(data) and (time[right]-time[left]) < thresh:
+            right+=1
+        if right == len(data):
+            end = 1
+            right-=1
+        mid = math.floor(left + (right - left)/2)
+        go = 0
+        if data[mid] > data[left] and data[mid] > data[right]:
+            t_l = left
+            t_r = right
+            while(t_l > 0 and time[left]-time[t_l] < thresh/2):
+                t_l-=1
+            while(t_r < len(data)-1 and time[t_r]-time[right] < thresh/2):
+                t_r+=1
+            left_sd = round(np.std(data[t_l:left])/(bdp_thresh*2),3)
+            right_sd = round(np.std(data[right:t_r])/(bdp_thresh*2),3)
+            if float(abs(data[left]-data[right]))/data[left] < error:
+                # this has the left and right points not too different from each other
+                side_avg = float((data[left]+data[right]))/2
+                local_max = max(data[left:right+1])
+                if float(local_max)/side_avg > alpha and local_max > bdp_thresh:
+                    # this means that the peak is quite steep
+                    if (left_sd < st_thresh) and (right_sd < st_thresh):
+                        # this means that the lest and right are quite stable respectvely
+                        go = 1
+        if go == 1:
+            try :
+                probe_index.append([left,right,float(local_max)/side_avg, time[right]-time[left], left_sd, right_sd, t_l,t_r])
+            except :
+                probe_index.append([left,right])
+            #Once you have found something you directly move past it
+            left = right-1
+        if end:
+            right+=1
+        left+=1
+    return probe_index
+
+
+def range_max(data):
+    '''
+    Sparse table of data, returns a function giving max(data[l:r+1]) for
+    arrays of l and r.
+    '''
+    table = [data]
+    width = 1
+    while 2*width <= len(data):
+        prev = table[-1]
+        table.append(np.maximum(prev[:-width], prev[width:]))
+        width *= 2
+
+    def query(l, r):
+        k = np.floor(np.log2(r - l + 1)).astype(np.int64)
+        out = np.empty(len(l))
+        for level in np.unique(k).tolist():
+            at = k == level
+            out[at] = np.maximum(table[level][l[at]], table[level][r[at] - (1 << level) + 1])
+        return out
+    return query
+
+
+def side_ends(time, left, right, half):
+    # where the loop's t_l and t_r end for a window [left, right]
+    n = len(time)
+    t_l = bisect.bisect_right(time, time[left] - half, 0, left+1) - 1
+    while t_l + 1 <= left and time[left]-time[t_l+1] >= half:
+        t_l += 1
+    while t_l >= 0 and not time[left]-time[t_l] >= half:
+        t_l -= 1
+    t_l = max(t_l, 0)
+    t_r = bisect.bisect_left(time, time[right] + half, right, n)
+    while t_r - 1 >= right and time[t_r-1]-time[right] >= half:
+        t_r -= 1
+    while t_r < n and not time[t_r]-time[right] >= half:
+        t_r += 1
+    t_r = min(t_r, n-1)
+    return t_l, t_r
+
+
+def check_probe(time, data, left, right, thresh, st_thresh, error, alpha, bdp_thresh):
+    # the tests of the loop for one window, the probe or None
+    t_l, t_r = side_ends(time, left, right, thresh/2)
+    if not float(abs(data[left]-data[right]))/data[left] < error:
+        return None
+    side_avg = float((data[left]+data[right]))/2
+    local_max = max(data[left:right+1])
+    if not (float(local_max)/side_avg > alpha and local_max > bdp_thresh):
+        return None
+    left_sd = round(np.std(data[t_l:left])/(bdp_thresh*2),3)
+    right_sd = round(np.std(data[right:t_r])/(bdp_thresh*2),3)
+    if not ((left_sd < st_thresh) and (right_sd < st_thresh)):
+        return None
+    return [left,right,float(local_max)/side_avg, time[right]-time[left], left_sd, right_sd, t_l,t_r]
+
+
+def getProbes(time, data, rtt, bdp, bw=200):
+    n = len(data)
+    time_a = np.asarray(time, dtype="float64")
+    if n == 0 or np.any(time_a[1:] < time_a[:-1]) or not rtt > 0 or not bw > 0:
+        return getProbes_loop(time, data, rtt, bdp, bw)
+    windows, st_thresh, error, alpha = get_params(rtt, bw)
+    thresh = windows*rtt
+    bdp_thresh = bdp/2
+    time = time_a.tolist()
+    data = np.asarray(data, dtype="float64").tolist()
+    data_a = np.asarray(data)
+
+    # the window of every start, the last one reaches the end of the trace
+    ends = window_ends(time_a, thresh)
+    left = np.arange(n)
+    right = np.minimum(ends, n-1)
+    mid = left + (right - left)//2
+    last = int(np.argmax(ends >= n))
+
+    d_l = data_a[left]
+    d_r = data_a[right]
+    peak = (data_a[mid] > d_l) & (data_a[mid] > d_r)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        close = np.abs(d_l - d_r)/d_l < error
+        side_avg = (d_l + d_r)/2
+        local_max = range_max(data_a)(left, right)
+        steep = (local_max/side_avg > alpha) & (local_max > bdp_thresh)
+    # divisions by zero have to raise like they did, so those starts are kept
+    candidates = np.flatnonzero(peak & ((d_l == 0) | (close & ((side_avg == 0) | steep))))
+    candidates = candidates.tolist()
+
+    probe_index = []
+    start = 0
+    i = 0
+    while i < len(candidates):
+        c = candidates[i]
+        # the starts after `last` are never reached
+        if c > max(start, last):
+            break
+        if c < start:
+            i = bisect.bisect_left(candidates, start, i)
+            continue
+        r = int(right[c])
+        probe = check_probe(time, data, c, r, thresh, st_thresh, error, alpha, bdp_thresh)
+        if probe is not None:
+            probe_index.append(probe)
+            if c >= last:
+                break
+            start = r
+        i += 1
+    return probe_index
+
+
+def get_peaks(data, probe_index):
+    # index of the (first) maximum inside every probe window
+    data = np.asarray(data)
+    return np.array([p[0] + int(np.argmax(data[p[0]:p[1]+1])) for p in probe_index], dtype=np.int64)
+
+
+def isBBR(time, data, probe_index, rtt, bw):
+    '''
+    "YES BBR" when three probe peaks in a row are a probing period apart,
+    otherwise "MAYBE BBR" if there is more than one probe and "NO BBR" if not.
+    '''
+    peak_time = np.asarray(time, dtype="float64")[get_peaks(data, probe_index)]
+    gaps = np.abs(np.diff(peak_time))
+    # a peak at time 0 was taken as no previous peak
+    gaps = gaps[peak_time[:-1] != 0]
+    if len(gaps) > 1:
+        l, r = get_peak_range(rtt, bw)
+        inside = (gaps > l*rtt) & (gaps < r*rtt)
+        if np.any(inside[1:] & inside[:-1]):
+            return "YES BBR"
+    if len(probe_index) <= 1:
+        return "NO BBR"
+    return "MAYBE BBR"
@@ -0,0 +1,289 @@
+'''
+Benchmarks of the analysis stages on a folder of -tcp.csv traces.
+
+Usage:
+python3 -m nebby.bench flows folder_path
+    time per packet and memory per sample of the flows built for every
+    trace, as the old dicts of lists and as Flow objects
+python3 -m nebby.bench smooth folder_path [folder_path ...]
+    checks that smooth.smoothen gives exactly what the old loop gave on the
+    bif of the largest flow of every trace (as is and after the FFT
+    smoothening), and times both
+python3 -m nebby.bench probes folder_path [folder_path ...]
+    checks that bbr.getProbes finds the same probes as the old loop on the
+    smoothened trace of every file, for both bandwidth settings, and times
+    both
+python3 -m nebby.bench bbr sensitivity_path
+    runs the BBR check on every <d>-ms-<bw>-kbps/<cc>.csv of the sensitivity
+    runs and prints how many bbr and how many other traces are called BBR
+    for every bandwidth and for the held out runs, failing when fewer bbr
+    runs or more other traces are called BBR than BBR_MIN_DETECTED and
+    BBR_MAX_FALSE allow
+python3 -m nebby.bench imports file_path
+    runs python3 -m nebby file file_path n with -X importtime (once before
+    to fill the caches) and prints the time spent importing, the modules
+    that took the longest and the heavy ones that were imported, failing
+    when either run fails, the imports are over IMPORT_BUDGET_MS or a heavy
+    module was imported
+'''
+
+import os
+import sys
+import time
+import subprocess
+import tracemalloc
+
+import numpy as np
+
+from nebby import flows as nf
+from nebby import smooth
+from nebby import bbr
+
+
+def get_files(folder):
+    return sorted(os.path.join(folder, f) for f in os.listdir(folder) if f.endswith("-tcp.csv"))
+
+
+def best_time(fn, repeat=5):
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        taken = time.perf_counter() - start
+        if best is None or taken < best:
+            best = taken
+    return best, result
+
+
+def held_memory(fn):
+    # bytes still allocated by the result of fn once it returns
+    tracemalloc.start()
+    result = fn()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size, result
+
+
+def as_dicts(cols):
+    # what process_flows used to return, a dict of lists per flow
+    return {port: {k: flow[k] for k in flow} for port, flow in nf.get_bif(cols).items()}
+
+
+def as_flows(cols):
+    trace = nf.BifTrace()
+    trace.add(cols)
+    return trace.get_flows(as_list=False)
+
+
+def bench_flows(folder):
+    print("%-40s %8s %10s %10s %10s %10s" % ("trace", "packets", "dict us/p", "Flow us/p", "dict B/s", "Flow B/s"))
+    total = [0, 0.0, 0.0, 0, 0, 0]
+    for name in get_files(folder):
+        cols = nf.load_columns(name)
+        packets = len(cols["frame_time_rel"])
+        if packets == 0:
+            continue
+        dict_time, _ = best_time(lambda: as_dicts(cols))
+        flow_time, _ = best_time(lambda: as_flows(cols))
+        dict_mem, result = held_memory(lambda: as_dicts(cols))
+        flow_mem, _ = held_memory(lambda: as_flows(cols))
+        samples = sum(len(f["times"]) for f in result.values())
+        if samples == 0:
+            continue
+        print("%-40s %8d %10.3f %10.3f %10.1f %10.1f" % (os.path.basename(name)[:40], packets,
+              1e6*dict_time/packets, 1e6*flow_time/packets, dict_mem/samples, flow_mem/samples))
+        for i, v in enumerate([packets, dict_time, flow_time, dict_mem, flow_mem, samples]):
+            total[i] += v
+    if total[0] > 0 and total[5] > 0:
+        print("%-40s %8d %10.3f %10.3f %10.1f %10.1f" % ("all", total[0], 1e6*total[1]/total[0],
+              1e6*total[2]/total[0], total[3]/total[5], total[4]/total[5]))
+
+
+def get_largest_flow(name):
+    flows = nf.get_bif(nf.load_columns(name))
+    if len(flows) == 0:
+        return None
+    flow = max(flows.values(), key=lambda f: len(f["windows"]))
+    return flow["times"], flow["windows"]
+
+
+def low_pass(time, data, rtt):
+    # the FFT smoothening the scripts apply before smoothen
+    yf = np.fft.rfft(data)
+    xf = np.fft.rfftfreq(len(data), 0.002)
+    yf[np.argmax(xf > 1/rtt)+1:] = 0
+    new_data = np.fft.irfft(yf)
+    return time[len(time)-len(new_data):], new_data
+
+
+def bench_smooth(*folders):
+    print("%-40s %6s %8s %10s %10s %6s" % ("trace", "rtt", "samples", "loop ms", "numpy ms", "same"))
+    checked = 0
+    wrong = 0
+    for folder in folders:
+        for name in get_files(folder):
+            flow = get_largest_flow(name)
+            if flow is None:
+                continue
+            time, data = flow
+            for rtt in [0.05, 0.1, 0.2]:
+                for t, d in [(time, data), low_pass(time, data, rtt)]:
+                    loop_time, expected = best_time(lambda: smooth.smoothen_loop(t, d, rtt), 1)
+                    numpy_time, got = best_time(lambda: smooth.smoothen(t, d, rtt), 3)
+                    same = got == expected
+                    checked += 1
+                    wrong += not same
+                    print("%-40s %6.2f %8d %10.2f %10.2f %6s" % (os.path.basename(name)[:40], rtt, len(t),
+                          1e3*loop_time, 1e3*numpy_time, same))
+    print("Checked", checked, "series,", wrong, "different")
+
+
+def get_smooth_trace(name, rtt):
+    flow = get_largest_flow(name)
+    if flow is None:
+        return None
+    time, data = smooth.get_fft_smoothening(flow[1], flow[0], 0, rtt, "n")
+    return smooth.smoothen(time, data, rtt)
+
+
+def bench_probes(*folders):
+    rtt = 0.1
+    print("%-40s %6s %8s %7s %10s %10s %6s" % ("trace", "bw", "samples", "probes", "loop ms", "numpy ms", "same"))
+    checked = 0
+    wrong = 0
+    for folder in folders:
+        for name in get_files(folder):
+            trace = get_smooth_trace(name, rtt)
+            if trace is None:
+                continue
+            time, data = trace
+            for bw in [50, 200, 1000]:
+                for bf in [0.5, 2]:
+                    bdp = float(bw*rtt*1000*bf)/8
+                    loop_time, expected = best_time(lambda: bbr.getProbes_loop(time, data, rtt, bdp, bw), 1)
+                    numpy_time, got = best_time(lambda: bbr.getProbes(time, data, rtt, bdp, bw), 3)
+                    same = got == expected
+                    checked += 1
+                    wrong += not same
+                    print("%-40s %6d %8d %7d %10.2f %10.2f %6s" % (os.path.basename(name)[:40], bw, len(time),
+                          len(expected), 1e3*loop_time, 1e3*numpy_time, same))
+    print("Checked", checked, "traces,", wrong, "different")
+
+
+def check_bbr(name, rtt, bw, bf):
+    # what checkBBR does on a trace, rtt in seconds
+    trace = get_smooth_trace(name, rtt)
+    if trace is None:
+        return "NC"
+    time, data = trace
+    bdp = float(bw*rtt*1000*bf)/8
+    return bbr.isBBR(time, data, bbr.getProbes(time, data, rtt, bdp, bw), rtt, bw)
+
+
+# the detection bbr.py has to keep on the sensitivity runs, at every bandwidth from BBR_MIN_BW
+# kbps and over the held out runs: at least BBR_MIN_DETECTED of the bbr runs and at most
+# BBR_MAX_FALSE of the others called BBR (YES or MAYBE, the scripts take both as BBR). At
+# 50 kbps the BDP is 2 to 12 packets of 100 bytes and a probe is at most 3 of them, only
+# the others called BBR are checked there.
+BBR_MIN_DETECTED = 0.6
+BBR_MAX_FALSE = 0.05
+BBR_MIN_BW = 100
+# the delays of the runs the thresholds were not fitted on
+BBR_HELD_OUT = [25, 45]
+
+
+def detection(results):
+    # bbr YES, bbr called BBR, bbr runs, other YES, other called BBR, other runs, NC left out
+    bbr_runs = [label for cc, label in results if cc == "bbr" and label != "NC"]
+    other = [label for cc, label in results if cc != "bbr" and label != "NC"]
+    called = lambda labels: len([label for label in labels if label in ["YES BBR", "MAYBE BBR"]])
+    return (bbr_runs.count("YES BBR"), called(bbr_runs), len(bbr_runs),
+            other.count("YES BBR"), called(other), len(other))
+
+
+def bench_bbr(folder):
+    # the runs of scripts/test_diff_profiles.sh: 5 ms before the link, <d> ms after it, a buffer of 1 BDP
+    results = {}
+    held_out = []
+    for run in sorted(os.listdir(folder)):
+        parts = run.split("-")
+        if len(parts) != 4 or parts[1] != "ms" or parts[3] != "kbps":
+            continue
+        rtt = float((5 + int(parts[0]))*2)/1000
+        bw = int(parts[2])
+        for name in sorted(os.listdir(os.path.join(folder, run))):
+            if not name.endswith(".csv"):
+                continue
+            cc = name[:-4]
+            label = check_bbr(os.path.join(folder, run, name), rtt, bw, 1)
+            results.setdefault(bw, []).append((cc, label))
+            if int(parts[0]) in BBR_HELD_OUT and bw >= BBR_MIN_BW:
+                held_out.append((cc, label))
+            print("%-20s %-12s %s" % (run, cc, label))
+    rows = [("%d kbps" % bw, detection(results[bw]), bw >= BBR_MIN_BW) for bw in sorted(results)]
+    rows.append(("held out", detection(held_out), True))
+    print("%-10s %12s %12s %12s %12s" % ("", "bbr YES", "bbr BBR", "other YES", "other BBR"))
+    failed = []
+    for name, (yes, called, runs, false_yes, false_called, others), required in rows:
+        print("%-10s %8d/%-3d %8d/%-3d %8d/%-3d %8d/%-3d" % (name, yes, runs, called, runs,
+              false_yes, others, false_called, others))
+        if (required and called < BBR_MIN_DETECTED*runs) or false_called > BBR_MAX_FALSE*others:
+            failed.append(name)
+    print("required: %d%% of the bbr runs called BBR from %d kbps, at most %d%% of the others" %
+          (100*BBR_MIN_DETECTED, BBR_MIN_BW, 100*BBR_MAX_FALSE))
+    if failed:
+        print("below the required detection at", ", ".join(failed))
+        sys.exit(1)
+
+
+IMPORT_BUDGET_MS = 300
+HEAVY = ["matplotlib", "pandas", "scipy", "sklearn"]
+
+
+def get_import_times(lines):
+    # (cumulative us, module) of the modules imported at the top level
+    times = []
+    for line in lines:
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative, name = line[len("import time:"):].split("|")
+        if len(name) - len(name.lstrip()) == 1:
+            times.append((int(cumulative), name.strip()))
+    return times
+
+
+def bench_imports(name):
+    command = [sys.executable, "-X", "importtime", "-m", "nebby", "file", os.path.abspath(name), "n"]
+    env = dict(os.environ, PYTHONPATH=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    for warm in [True, False]:
+        start = time.perf_counter()
+        run = subprocess.run(command, env=env, capture_output=True, text=True)
+        total = time.perf_counter() - start
+        if run.returncode != 0:
+            # a run that stopped early imports little and would pass the budget
+            print(" ".join(command), "failed with", run.returncode, "(warm-up run)" if warm else "")
+            print("\n".join(line for line in run.stderr.splitlines() if not line.startswith("import time:")))
+            sys.exit(1)
+    times = get_import_times(run.stderr.splitlines())
+    imported = [line.split("|")[2].strip() for line in run.stderr.splitlines()
+                if line.startswith("import time:") and "cumulative" not in line]
+    heavy = sorted(set(m.split(".")[0] for m in imported if m.split(".")[0] in HEAVY))
+    import_ms = sum(t for t, m in times)/1000
+    print(run.stdout.strip().splitlines()[-1] if run.stdout.strip() else "no output")
+    print("run %.0f ms, imports %.0f ms (budget %d ms)" % (total*1000, import_ms, IMPORT_BUDGET_MS))
+    for t, m in sorted(times, reverse=True)[:8]:
+        print("%8.1f ms  %s" % (t/1000, m))
+    print("heavy modules imported:", ", ".join(heavy) if heavy else "none")
+    if import_ms > IMPORT_BUDGET_MS or heavy:
+        sys.exit(1)
+
+
+benches = {"flows": bench_flows, "smooth": bench_smooth, "probes": bench_probes, "bbr": bench_bbr,
+           "imports": bench_imports}
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3 or sys.argv[1] not in benches:
+        print("python3 -m nebby.bench [" + "|".join(benches) + "] folder_path|file_path")
+        exit()
+    benches[sys.argv[1]](*sys.argv[2:])
@@ -0,0 +1,115 @@
+'''
+Binary cache of the parsed -tcp.csv columns.
+
+The first time a trace is read its columns are written to
+__nebbycache__/<name>.npz next to the csv. Later reads load the arrays
+straight from there as long as the csv still has the same path, size and
+mtime, so re-running a script over an analysed folder skips the text parsing.
+
+Set NEBBY_CACHE=0 in the environment to always read the csv.
+
+Usage (to fill the cache for a whole folder up front):
+python3 -m nebby.cache folder_path
+'''
+
+import os
+import sys
+import numpy as np
+
+from nebby.lazy import lazy
+
+pd = lazy("pandas")
+
+CACHE_DIR = "__nebbycache__"
+VERSION = 2
+
+USE_CACHE = os.environ.get("NEBBY_CACHE", "1") != "0"
+
+
+def cache_path(name):
+    folder, file_name = os.path.split(os.path.abspath(name))
+    return os.path.join(folder, CACHE_DIR, file_name + ".npz")
+
+
+def get_key(name):
+    st = os.stat(name)
+    return os.path.abspath(name), st.st_size, st.st_mtime_ns
+
+
+def load(name):
+    '''
+    Returns the cached columns of the csv or None when there is no valid cache.
+    '''
+    path = cache_path(name)
+    if not os.path.exists(path):
+        return None
+    source, size, mtime = get_key(name)
+    try:
+        with np.load(path) as npz:
+            if int(npz["version"]) != VERSION or str(npz["source"]) != source \
+                    or int(npz["size"]) != size or int(npz["mtime"]) != mtime:
+                return None
+            cols = {}
+            for f in npz["fields"].tolist():
+                if f+"_codes" in npz:
+                    # strings are kept as codes into a table of the unique values
+                    table = np.array(npz[f+"_table"].tolist() + [np.nan], dtype=object)
+                    cols[f] = table[npz[f+"_codes"]]
+                else:
+                    cols[f] = npz[f]
+    except (OSError, ValueError, KeyError):
+        return None
+    return cols
+
+
+def store(name, cols):
+    '''
+    Writes the columns of the csv to the cache, a folder that can not be
+    written to just means there is no cache.
+    '''
+    path = cache_path(name)
+    source, size, mtime = get_key(name)
+    arrays = {"version": VERSION, "source": source, "size": size, "mtime": mtime,
+              "fields": np.array(list(cols.keys()))}
+    for f, values in cols.items():
+        if values.dtype == object:
+            codes, table = pd.factorize(values)
+            # empty cells point one past the table
+            codes[codes < 0] = len(table)
+            arrays[f+"_table"] = np.array(table, dtype=str)
+            arrays[f+"_codes"] = codes.astype(np.int32)
+        else:
+            arrays[f] = values
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + ".%d.tmp" % os.getpid()
+        with open(tmp, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(tmp, path)
+    except OSError:
+        pass
+
+
+def load_columns(name, read):
+    '''
+    Columns of the csv `name`, from the cache when possible, otherwise parsed
+    with read(name) and cached.
+    '''
+    if not USE_CACHE:
+        return read(name)
+    cols = load(name)
+    if cols is None:
+        cols = read(name)
+        store(name, cols)
+    return cols
+
+
+if __name__ == "__main__":
+    from nebby.flows import load_columns as load_trace
+    folder = sys.argv[1]
+    count = 0
+    for f in sorted(os.listdir(folder)):
+        if f.endswith("-tcp.csv"):
+            load_trace(os.path.join(folder, f))
+            count += 1
+    print("Cached", count, "traces in", os.path.join(folder, CACHE_DIR))
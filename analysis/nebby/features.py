@@ -0,0 +1,129 @@
+'''
+The features cut out of a bif trace for the polynomial fits.
+
+getRed / getRed_R return one FeatureRecord per feature: the trace it comes
+from, the name the scripts group it by (the website, or cc-version for the
+training traces), the cc when the trace has one, its number in the trace
+(from 1), rtt, bdp and the resampled and smoothened time and data arrays.
+The scripts normalize time and data in place and the fit of every degree
+is kept on the record (p_net, mse_l, like get_degree_all returns them).
+
+fit_records() fits a list of records together: the features of the same
+length (most of them, they are all resampled to the same number of points)
+are stacked and fitted in one nebby.fit.polyfit_all call.
+
+FeatureTable holds records as columns (one array per field, time and data
+of all features back to back with their offsets), which is what gets
+written to disk.
+'''
+
+import numpy as np
+
+from nebby.fit import polyfit_all
+
+WINDOW = 25
+
+
+def rolling_mean(values, window=WINDOW):
+    '''
+    Centered moving average over window samples, only where the window is
+    full (what pandas rolling(window, center=True).mean().dropna() keeps).
+    '''
+    values = np.asarray(values, dtype="float64")
+    if len(values) < window:
+        return np.zeros(0)
+    out = np.lib.stride_tricks.sliding_window_view(values, window).mean(axis=-1)
+    return out[~np.isnan(out)]
+
+
+class FeatureRecord:
+    __slots__ = ["trace", "name", "cc", "index", "rtt", "bdp", "time", "data", "p_net", "mse_l"]
+
+    def __init__(self, trace, name, index, rtt, bdp, time, data, cc=None):
+        self.trace = trace
+        self.name = name
+        self.cc = cc
+        self.index = index
+        self.rtt = rtt
+        self.bdp = bdp
+        self.time = time
+        self.data = data
+        self.p_net = None
+        self.mse_l = None
+
+    def __repr__(self):
+        return "FeatureRecord(%s, %d, %d points)" % (self.name, self.index, len(self.time))
+
+
+def fit_records(records, max_deg=3):
+    '''
+    Sets p_net (coefficients of every degree, highest power first) and mse_l
+    on every record.
+    '''
+    lengths = np.array([len(r.time) for r in records], dtype=np.int64)
+    for n in np.unique(lengths).tolist():
+        group = [records[i] for i in np.flatnonzero(lengths == n).tolist()]
+        if len(group) == 1:
+            r = group[0]
+            r.p_net, r.mse_l = polyfit_all(r.time, r.data, max_deg)
+            continue
+        p_net, mse_l = polyfit_all(np.array([r.time for r in group]), np.array([r.data for r in group]), max_deg)
+        for k, r in enumerate(group):
+            r.p_net = [c[k] for c in p_net]
+            r.mse_l = [float(e[k]) for e in mse_l]
+    return records
+
+
+class FeatureTable:
+    '''
+    Records as columns. time and data are the features back to back, the
+    feature i is at offset[i]:offset[i+1]. coeffs[i, d-1] has the d+1
+    coefficients of degree d (padded with NaN in front) and mse[i, d-1] its
+    error, both NaN for records that were not fitted.
+    '''
+    str_columns = ["trace", "name", "cc"]
+
+    def __init__(self, columns):
+        self.columns = columns
+
+    def __len__(self):
+        return len(self.columns["index"])
+
+    @classmethod
+    def from_records(cls, records, max_deg=3):
+        lengths = [len(r.time) for r in records]
+        coeffs = np.full((len(records), max_deg, max_deg+1), np.nan)
+        mse = np.full((len(records), max_deg), np.nan)
+        for i, r in enumerate(records):
+            if r.p_net is None:
+                continue
+            for d in range(min(max_deg, len(r.p_net))):
+                coeffs[i, d, max_deg-d-1:] = r.p_net[d]
+                mse[i, d] = r.mse_l[d]
+        columns = {f: np.array([getattr(r, f) if getattr(r, f) is not None else "" for r in records], dtype=str)
+                   for f in cls.str_columns}
+        columns.update({
+            "index": np.array([r.index for r in records], dtype=np.int64),
+            "rtt": np.array([r.rtt for r in records], dtype="float64"),
+            "bdp": np.array([r.bdp for r in records], dtype="float64"),
+            "offset": np.r_[0, np.cumsum(lengths, dtype=np.int64)],
+            "time": np.concatenate([np.asarray(r.time, dtype="float64") for r in records] + [np.zeros(0)]),
+            "data": np.concatenate([np.asarray(r.data, dtype="float64") for r in records] + [np.zeros(0)]),
+            "coeffs": coeffs,
+            "mse": mse,
+        })
+        return cls(columns)
+
+    def records(self):
+        c = self.columns
+        out = []
+        max_deg = c["mse"].shape[1]
+        for i in range(len(self)):
+            s, e = int(c["offset"][i]), int(c["offset"][i+1])
+            r = FeatureRecord(str(c["trace"][i]), str(c["name"][i]), int(c["index"][i]), float(c["rtt"][i]),
+                              float(c["bdp"][i]), c["time"][s:e], c["data"][s:e], cc=str(c["cc"][i]) or None)
+            if not np.isnan(c["mse"][i]).all():
+                r.p_net = [c["coeffs"][i, d, max_deg-d-1:] for d in range(max_deg)]
+                r.mse_l = [float(m) for m in c["mse"][i]]
+            out.append(r)
+        return out
@@ -0,0 +1,118 @@
+'''
+Polynomial fits of the normalized features.
+
+polyfit_all() fits every degree from 1 to max_deg to a feature with one QR
+decomposition: the columns of the Vandermonde matrix go up in power, so the
+least squares fit of degree d only uses the first d+1 columns of Q and the
+top left (d+1)x(d+1) block of R. The columns are scaled to unit norm first,
+like np.polyfit does, and the coefficients come out highest power first like
+np.polyfit returns them.
+
+Several features of the same length can be fitted together by passing them
+as the rows of 2-D arrays, NumPy then does all the decompositions in one call.
+
+Features the QR can not handle (too few points, a constant time axis, NaN or
+inf) are left to np.polyfit so they behave (and fail) the way they did.
+
+Usage (checks the fits against np.polyfit on random features and times both):
+python3 -m nebby.fit
+'''
+
+import sys
+import time
+import numpy as np
+
+
+def vander(time, max_deg):
+    # columns time**0 .. time**max_deg
+    return time[..., None] ** np.arange(max_deg+1)
+
+
+def polyfit_loop(time, data, max_deg=3):
+    # what the scripts did, one np.polyfit per degree
+    p_net = []
+    mse_l = []
+    for d in range(1, max_deg+1):
+        p_temp = np.polyfit(time, data, d)
+        p_net.append(p_temp)
+        mse_l.append(float(np.mean((data - np.polyval(p_temp, time))**2)))
+    return p_net, mse_l
+
+
+def solvable(time, data, max_deg):
+    return time.shape[-1] > max_deg and np.all(np.isfinite(time)) and np.all(np.isfinite(data))
+
+
+def per_row(fn, time, data, max_deg):
+    # fn on every feature, put back together like a stacked fit
+    fits = [fn(t, y, max_deg) for t, y in zip(time, data)]
+    return ([np.array([f[0][d] for f in fits]) for d in range(max_deg)],
+            [np.array([f[1][d] for f in fits]) for d in range(max_deg)])
+
+
+def polyfit_all(time, data, max_deg=3):
+    '''
+    Fits of degree 1..max_deg of data over time, returns the list of the
+    coefficients (highest power first) and the list of the mean squared
+    errors, one per degree. With 2-D time and data (one feature per row)
+    every coefficient array has a row per feature and every error is an
+    array.
+    '''
+    time = np.asarray(time, dtype="float64")
+    data = np.asarray(data, dtype="float64")
+    if not solvable(time, data, max_deg):
+        if time.ndim == 2:
+            return per_row(polyfit_all, time, data, max_deg)
+        return polyfit_loop(time, data, max_deg)
+
+    V = vander(time, max_deg)
+    scale = np.sqrt((V*V).sum(axis=-2))
+    scale[scale == 0] = 1
+    Q, R = np.linalg.qr(V / scale[..., None, :])
+    diag = np.abs(np.diagonal(R, axis1=-2, axis2=-1))
+    if np.any(diag <= diag.max(axis=-1, keepdims=True) * time.shape[-1] * np.finfo("float64").eps):
+        # rank deficient, np.polyfit takes the minimum norm solution
+        if time.ndim == 2:
+            return per_row(polyfit_all, time, data, max_deg)
+        return polyfit_loop(time, data, max_deg)
+    qy = np.matmul(np.swapaxes(Q, -1, -2), data[..., None])
+
+    p_net = []
+    mse_l = []
+    for d in range(1, max_deg+1):
+        k = d+1
+        c = np.linalg.solve(R[..., :k, :k], qy[..., :k, :])[..., 0] / scale[..., :k]
+        fit = np.matmul(V[..., :k], c[..., None])[..., 0]
+        err = np.mean((data - fit)**2, axis=-1)
+        p_net.append(c[..., ::-1])
+        mse_l.append(float(err) if err.ndim == 0 else err)
+    return p_net, mse_l
+
+
+def check(count=2000, length=976, max_deg=3):
+    rng = np.random.default_rng(0)
+    times = np.sort(rng.uniform(0, 10, (count, length)), axis=1)
+    datas = 10*np.sin(times*rng.uniform(0.1, 1, (count, 1))) + rng.normal(0, 1, (count, length))
+    start = time.perf_counter()
+    expected = [polyfit_loop(t, y, max_deg) for t, y in zip(times, datas)]
+    loop_time = time.perf_counter() - start
+    start = time.perf_counter()
+    single = [polyfit_all(t, y, max_deg) for t, y in zip(times, datas)]
+    single_time = time.perf_counter() - start
+    start = time.perf_counter()
+    batch = polyfit_all(times, datas, max_deg)
+    batch_time = time.perf_counter() - start
+    worst = 0
+    for i in range(count):
+        for d in range(max_deg):
+            for p_net, mse_l in [single[i], ([b[i] for b in batch[0]], [m[i] for m in batch[1]])]:
+                worst = max(worst, np.max(np.abs(p_net[d] - expected[i][0][d]) / (np.abs(expected[i][0][d]) + 1e-12)),
+                            abs(mse_l[d] - expected[i][1][d]) / expected[i][1][d])
+    print("%d features of %d points, degrees 1..%d" % (count, length, max_deg))
+    print("np.polyfit %.3f s, one QR per feature %.3f s, stacked %.3f s" % (loop_time, single_time, batch_time))
+    print("largest relative difference %.2e" % worst)
+    return worst
+
+
+if __name__ == "__main__":
+    sys.exit(0 if check() < 1e-8 else 1)
@@ -0,0 +1,605 @@
+'''
+This is the file that has the code to generate the bytes-in-flight(bif) trace for a connection.
+
+The -tcp.csv written by tshark is loaded once into typed NumPy columns, the
+packets are grouped by the client's port and the max_seq / max_ack / duplicate
+ACK / retransmission bookkeeping is done with array operations. process_flows
+returns the same flows dict as the old per packet loop, so callers that read
+flows[port]["times"], ["windows"], ["retrans"], ["OOA"] and ["DA"] are unchanged.
+
+Captures larger than NEBBY_STREAM_MB megabytes (default 1024) are read in
+chunks of rows instead. The state of every flow is carried from one chunk to
+the next and the series are kept as NumPy arrays, so memory grows with the
+number of samples in compact form rather than with Python objects.
+
+When there is no <name>-tcp.csv but a <name>.pcap, the capture is read
+directly with nebby.pcap and tshark is not needed.
+
+The csvs of the sensitivity runs have their own column order and no ip.src,
+the source of every packet is then taken from the ports, and as nothing
+there has a client address the host is the receiver of the data.
+'''
+
+import os
+import csv
+from collections.abc import Mapping
+import numpy as np
+
+from nebby import cache
+from nebby import pcap
+from nebby.lazy import lazy
+
+pd = lazy("pandas")
+
+PKT_SIZE = 88
+
+# mahimahi hands out 100.64.0.x addresses, the even one is the client
+HOST_PREFIX = "100.64.0."
+
+STREAM_BYTES = int(float(os.environ.get("NEBBY_STREAM_MB", "1024"))*1024*1024)
+CHUNK_ROWS = 1000000
+
+yellow = '\033[93m'
+green = '\033[92m'
+red = '\033[91m'
+blue = '\033[94m'
+pink = '\033[95m'
+black = '\033[90m'
+
+# Column layout of the csv written by pcap2csv.sh, used when the header is missing or unknown
+fields=["time", "frame_time_rel", "tcp_time_rel", "frame_num", "frame_len", "ip_src", "src_port", "ip_dest", "dest_port", "tcp_len", "seq", "ack"]
+
+# tshark names of the columns that are needed for the bif trace
+tshark_names = {
+    "frame_time_rel": "frame.time_relative",
+    "frame_len": "frame.len",
+    "ip_src": "ip.src",
+    "src_port": "tcp.srcport",
+    "ip_dest": "ip.dst",
+    "dest_port": "tcp.dstport",
+    "tcp_len": "tcp.len",
+    "seq": "tcp.seq",
+    "ack": "tcp.ack",
+}
+
+str_fields = ["ip_src", "src_port", "ip_dest", "dest_port"]
+
+
+def get_column_index(header):
+    # the sensitivity runs have no ip.src column, it is filled in by get_columns
+    if all(tshark_names[f] in header for f in tshark_names if f != "ip_src"):
+        return {f: header.index(tshark_names[f]) for f in tshark_names if tshark_names[f] in header}
+    return {f: fields.index(f) for f in tshark_names}
+
+
+def get_sources(cols):
+    # the source of a packet is the address the packets to its source port go to
+    dest = pd.Series(cols["ip_dest"]).groupby(cols["dest_port"]).first()
+    return pd.Series(cols["src_port"]).map(dest).to_numpy(dtype=object)
+
+
+def get_columns(frame, index):
+    cols = {}
+    for f in index:
+        if f in str_fields:
+            cols[f] = frame[index[f]].to_numpy(dtype=object)
+        else:
+            cols[f] = frame[index[f]].to_numpy(dtype="float64")
+    if "ip_src" not in cols:
+        cols["ip_src"] = get_sources(cols)
+    return cols
+
+
+def read_csv(name, chunksize=None):
+    with open(name) as csv_file:
+        header = next(csv.reader(csv_file), [])
+    index = get_column_index(header)
+    dtype = {index[f]: (str if f in str_fields else "float64") for f in index}
+    try:
+        frames = pd.read_csv(name, header=None, skiprows=1, usecols=list(index.values()),
+                             dtype=dtype, chunksize=chunksize)
+    except pd.errors.EmptyDataError:
+        frames = pd.DataFrame({index[f]: [] for f in index})
+        if chunksize is not None:
+            frames = [frames]
+    return frames, index
+
+
+def read_columns(name):
+    '''
+    Parses a -tcp.csv into a dict of columns keyed by the names in `fields`.
+    Addresses and ports are object arrays of strings (NaN where empty),
+    everything else is float64 (NaN where empty).
+    '''
+    frame, index = read_csv(name)
+    return get_columns(frame, index)
+
+
+def read_chunks(name, chunksize=CHUNK_ROWS):
+    # Same columns as read_columns, chunksize rows at a time
+    frames, index = read_csv(name, chunksize)
+    for frame in frames:
+        yield get_columns(frame, index)
+
+
+def load_columns(name):
+    # the parsed columns are kept in a binary cache next to the csv
+    if name.endswith(".pcap"):
+        return cache.load_columns(name, pcap.read_columns)
+    return cache.load_columns(name, read_columns)
+
+
+def isna(values):
+    # the empty cells of an object column, NaN is the only value not equal to itself
+    return np.asarray(values != values, dtype=bool)
+
+
+def factorize(values):
+    '''
+    pd.factorize of an object column of strings: the codes in order of first
+    appearance (-1 where empty) and the unique strings, without needing
+    pandas when the columns come from the cache.
+    '''
+    missing = isna(values)
+    uniques, first, inverse = np.unique(values[~missing].astype(str), return_index=True, return_inverse=True)
+    order = np.argsort(first, kind="stable")
+    rank = np.empty(len(order), dtype=np.int64)
+    rank[order] = np.arange(len(order))
+    codes = np.full(len(values), -1, dtype=np.int64)
+    codes[~missing] = rank[inverse.reshape(-1)]
+    return codes, uniques[order].astype(object)
+
+
+def is_host(ips):
+    # Checking the unique addresses only, there are very few of them
+    codes, uniques = factorize(ips)
+    marks = np.array([HOST_PREFIX in ip and ip[-1] in "02468" for ip in uniques] + [False])
+    return marks[codes]
+
+
+def find_host(cols):
+    '''
+    The host is the first even numbered 100.64.0.x address in the trace.
+    Returns the host and the row from which the trace is read.
+    '''
+    src_host = is_host(cols["ip_src"])
+    dest_host = is_host(cols["ip_dest"])
+    rows = np.flatnonzero(src_host | dest_host)
+    if len(rows) == 0:
+        return find_receiver(cols)
+    start = rows[0]
+    if dest_host[start]:
+        return cols["ip_dest"][start], start
+    return cols["ip_src"][start], start
+
+
+def find_receiver(cols):
+    '''
+    Without a client address (the sensitivity runs send from inside the
+    mahimahi shell) the host is the address that receives the most TCP
+    payload.
+    '''
+    payload = np.nan_to_num(cols["tcp_len"])
+    has_dest = ~pd.isna(cols["ip_dest"]) & (payload > 0)
+    if not has_dest.any():
+        return None, len(payload)
+    received = pd.Series(payload[has_dest]).groupby(cols["ip_dest"][has_dest]).sum()
+    host = received.idxmax()
+    rows = np.flatnonzero((cols["ip_src"] == host) | (cols["ip_dest"] == host))
+    return host, rows[0]
+
+
+def group_max(values, group):
+    # running max of values restarted at every group, group has to be sorted
+    if len(values) == 0:
+        return values
+    offset = group * (int(values.max()) + 1)
+    return np.maximum.accumulate(values + offset) - offset
+
+
+def set_last(state, flow, values):
+    # state[f] = the last of the values of flow f, in capture order
+    ids, index = np.unique(flow[::-1], return_index=True)
+    state[ids] = values[::-1][index]
+
+
+def group_ffill(values, mask, group, default):
+    # for every position the value at the last masked position of the same group (sorted groups)
+    last = np.maximum.accumulate(np.where(mask, np.arange(len(mask)), -1))
+    ok = last >= 0
+    ok[ok] = group[last[ok]] == group[ok]
+    return np.where(ok, values[np.maximum(last, 0)], default)
+
+
+def get_ack_state(ack, flow, new, count, max_ack, back_ack=0):
+    '''
+    Tracks max_ack over the ACK packets (in capture order).
+    ack : ack numbers, flow : flow id, new : the packet opens the flow,
+    count : number of bif samples the flow already has,
+    max_ack : max_ack of every flow before these packets,
+    back_ack : the last out of order or duplicate ack before these packets.
+
+    Returns max_ack before the duplicate ACK correction (pre), max_ack after it
+    (post), the duplicate / out of order flags, the packets where the
+    correction was applied and the new back_ack.
+
+    A duplicate ACK moves max_ack forward by PKT_SIZE, which changes how the
+    following ACKs of that flow are classified. Up to the first such correction
+    everything is a running max, after it the packets are walked one by one.
+    '''
+    n = len(ack)
+    if n == 0:
+        none = np.zeros(0, dtype=bool)
+        return ack, ack, none, none, none, back_ack
+    order = np.argsort(flow, kind="stable")
+    flow_s = flow[order]
+    run_max = group_max(ack[order], flow_s)
+    prev_s = np.r_[0, run_max[:-1]]
+    prev_s[np.r_[True, flow_s[1:] != flow_s[:-1]]] = 0
+    prev = np.empty(n, dtype=np.int64)
+    prev[order] = prev_s
+    prev = np.maximum(prev, max_ack[flow])
+
+    event = ~new & (ack <= prev)
+    event_index = np.flatnonzero(event)
+    back = np.r_[back_ack, ack[event_index][:-1]]
+    dup = np.zeros(n, dtype=bool)
+    dup[event_index] = ack[event_index] == back
+    ooa = event & ~dup
+    adjust = dup & (count > 10)
+    pre = np.maximum(prev, ack)
+    post = pre.copy()
+    if not adjust.any():
+        if len(event_index) > 0:
+            back_ack = int(ack[event_index[-1]])
+        return pre, post, dup, ooa, adjust, back_ack
+
+    k0 = int(np.argmax(adjust))
+    max_ack = max_ack.copy()
+    np.maximum.at(max_ack, flow[:k0], ack[:k0])
+    max_ack = max_ack.tolist()
+    before = event_index[event_index < k0]
+    back = int(ack[before[-1]]) if len(before) > 0 else back_ack
+
+    ack_l = ack[k0:].tolist()
+    flow_l = flow[k0:].tolist()
+    new_l = new[k0:].tolist()
+    count_l = count[k0:].tolist()
+    pre_l = []
+    post_l = []
+    dup_l = []
+    ooa_l = []
+    adjust_l = []
+    for a, f, nw, c in zip(ack_l, flow_l, new_l, count_l):
+        d = False
+        o = False
+        if nw:
+            m = a
+        else:
+            m = max_ack[f]
+            if a <= m:
+                if a == back:
+                    d = True
+                else:
+                    o = True
+                back = a
+            else:
+                m = a
+        pre_l.append(m)
+        adj = d and c > 10
+        if adj:
+            m += PKT_SIZE
+        max_ack[f] = m
+        post_l.append(m)
+        dup_l.append(d)
+        ooa_l.append(o)
+        adjust_l.append(adj)
+    pre[k0:] = pre_l
+    post[k0:] = post_l
+    dup[k0:] = dup_l
+    ooa[k0:] = ooa_l
+    adjust[k0:] = adjust_l
+    return pre, post, dup, ooa, adjust, back
+
+
+series = ["times", "windows", "retrans", "OOA", "DA"]
+
+# keys the old flow dicts had but nothing fills anymore, with the value they were left at
+legacy_keys = {"act_times": list, "cwnd": list, "bif": int, "pif": int, "drop": list, "next": int}
+
+flow_keys = ["OOA", "DA", "max_seq", "loss_bif", "max_ack", "serverip", "serverport", "act_times", "times",
+             "windows", "cwnd", "bif", "last_ack", "last_seq", "pif", "drop", "next", "retrans"]
+
+
+class Flow(Mapping):
+    '''
+    One flow of the trace. Only the server address, the final counters and
+    the sample series are stored. last_ack and last_seq are the ack of the
+    last ACK and the seq of the last data packet as they were captured,
+    without the duplicate ACK correction of max_ack. While the trace is built every series is a
+    list of arrays, one per chunk, finish() joins them.
+
+    It reads like the dict the old process_flows built (flow["windows"],
+    flow.keys(), dict(flow), ...). With as_list the series are turned into
+    lists the first time they are read, otherwise they stay NumPy arrays.
+    '''
+    __slots__ = ["serverip", "serverport", "max_seq", "max_ack", "last_seq", "last_ack", "loss_bif", "as_list"] + series
+
+    def __init__(self, serverip, serverport):
+        self.serverip = serverip
+        self.serverport = serverport
+        self.max_seq = 0
+        self.max_ack = 0
+        self.last_seq = 0
+        self.last_ack = 0
+        self.loss_bif = 0
+        self.as_list = True
+        for k in series:
+            setattr(self, k, [])
+
+    def add(self, times, windows, retrans, OOA, DA):
+        self.times.append(times)
+        self.windows.append(windows)
+        self.retrans.append(retrans)
+        self.OOA.append(OOA)
+        self.DA.append(DA)
+
+    def finish(self, as_list=True):
+        self.as_list = as_list
+        for k in series:
+            parts = getattr(self, k)
+            if isinstance(parts, list):
+                if len(parts) == 1:
+                    setattr(self, k, parts[0])
+                elif len(parts) > 1:
+                    setattr(self, k, np.concatenate(parts))
+                else:
+                    setattr(self, k, np.zeros(0, dtype=np.int64 if k == "windows" else "float64"))
+
+    def __getitem__(self, key):
+        if key in legacy_keys:
+            return legacy_keys[key]()
+        if key not in flow_keys:
+            raise KeyError(key)
+        value = getattr(self, key)
+        if self.as_list and isinstance(value, np.ndarray):
+            value = value.tolist()
+            setattr(self, key, value)
+        return value
+
+    def __iter__(self):
+        return iter(flow_keys)
+
+    def __len__(self):
+        return len(flow_keys)
+
+
+class BifTrace:
+    '''
+    Flow tracking:
+    o Identify all packets that are either sourced from or headed to the host
+    o Group different flows by client's port
+    o ACKs from the host move max_ack, data packets to the host move max_seq,
+      bif = max_seq - max_ack + PKT_SIZE with the duplicate ACK correction
+
+    The packets are handed to add() in capture order, one chunk of columns at
+    a time. What the next chunk needs is kept per flow id (number of samples,
+    max_seq, max_ack, last_seq, last_ack, loss_bif and the last bif sample and
+    its time) along with the host and the last out of order ack. The samples go to the Flow of
+    every port, one array per chunk, and are put together by get_flows().
+    '''
+    def __init__(self, p="n"):
+        self.p = p
+        self.host = None
+        self.back_ack = 0
+        self.ids = {}
+        self.flows = {}
+        self.count = np.zeros(0, dtype=np.int64)
+        self.max_seq = np.zeros(0, dtype=np.int64)
+        self.max_ack = np.zeros(0, dtype=np.int64)
+        self.last_seq = np.zeros(0, dtype=np.int64)
+        self.last_ack = np.zeros(0, dtype=np.int64)
+        self.loss_bif = np.zeros(0, dtype=np.int64)
+        self.last_bif = np.zeros(0, dtype=np.int64)
+        self.last_time = np.zeros(0)
+        self.ooa = set()
+        self.rp = set()
+        self.ooaCount = 0
+        self.rpCount = 0
+
+    def add_flows(self, cols, rows, ack_pkt, port):
+        # Maps the ports of the chunk to flow ids, new ports get the next ids in order of appearance
+        codes, uniques = factorize(port)
+        firsts = np.unique(codes, return_index=True)[1]
+        ids = []
+        for u, i in zip(uniques.tolist(), firsts.tolist()):
+            if u not in self.ids:
+                self.ids[u] = len(self.ids)
+                r = rows[i]
+                if ack_pkt[i]:
+                    self.flows[u] = Flow(cols["ip_dest"][r], cols["dest_port"][r])
+                else:
+                    self.flows[u] = Flow(cols["ip_src"][r], cols["src_port"][r])
+            ids.append(self.ids[u])
+        grow = len(self.ids) - len(self.count)
+        if grow > 0:
+            for k in ["count", "max_seq", "max_ack", "last_seq", "last_ack", "loss_bif", "last_bif"]:
+                setattr(self, k, np.r_[getattr(self, k), np.zeros(grow, dtype=np.int64)])
+            self.last_time = np.r_[self.last_time, np.full(grow, np.nan)]
+        return np.array(ids, dtype=np.int64)[codes]
+
+    def add(self, cols):
+        start = 0
+        if self.host is None:
+            self.host, start = find_host(cols)
+            if self.host is None:
+                return
+        host = self.host
+        time = cols["frame_time_rel"]
+        live = np.arange(len(time)) >= start
+        has_time = ~np.isnan(time)
+        is_ack = live & (cols["ip_src"] == host) & has_time & ~np.isnan(cols["ack"])
+        is_data = live & ~is_ack & (cols["ip_dest"] == host) & has_time & ~np.isnan(cols["seq"])
+        rows = np.flatnonzero(is_ack | is_data)
+        if len(rows) == 0:
+            return
+
+        ack_pkt = is_ack[rows]
+        port = np.where(ack_pkt, cols["src_port"][rows], cols["dest_port"][rows])
+        port[isna(port)] = ""
+        flow = self.add_flows(cols, rows, ack_pkt, port)
+        time = time[rows]
+        seq = np.where(ack_pkt, 0, np.nan_to_num(cols["seq"][rows])).astype(np.int64)
+        ack = np.where(ack_pkt, np.nan_to_num(cols["ack"][rows]), 0).astype(np.int64)
+        set_last(self.last_ack, flow[ack_pkt], ack[ack_pkt])
+        set_last(self.last_seq, flow[~ack_pkt], seq[~ack_pkt])
+
+        # Everything per flow is done on the packets sorted by flow, capture order is kept inside a flow
+        m = len(rows)
+        order = np.argsort(flow, kind="stable")
+        flow_s = flow[order]
+        starts = np.flatnonzero(np.r_[True, flow_s[1:] != flow_s[:-1]])
+        ends = np.r_[starts[1:], m]
+        lasts = ends - 1
+        first_s = np.zeros(m, dtype=bool)
+        first_s[starts] = True
+        group_s = np.cumsum(first_s) - 1
+        count_s = self.count[flow_s] + np.arange(m) - starts[group_s]
+        ack_s = ack_pkt[order]
+        seq_s = seq[order]
+        time_s = time[order]
+        prev_time_s = np.r_[np.nan, time_s[:-1]]
+        prev_time_s[starts] = self.last_time[flow_s[starts]]
+
+        max_seq_s = np.maximum(group_max(seq_s, group_s), self.max_seq[flow_s])
+        prev_seq_s = np.r_[-1, max_seq_s[:-1]]
+        prev_seq_s[starts] = np.where(count_s[starts] > 0, self.max_seq[flow_s[starts]], -1)
+        retrans_s = ~ack_s & (seq_s < prev_seq_s)
+
+        count = np.empty(m, dtype=np.int64)
+        count[order] = count_s
+        ack_rows = np.flatnonzero(ack_pkt)
+        pre, post, dup, ooa, adjust, self.back_ack = get_ack_state(
+            ack[ack_rows], flow[ack_rows], count[ack_rows] == 0, count[ack_rows], self.max_ack, self.back_ack)
+
+        def to_sorted(values, default):
+            full = np.full(m, default, dtype=values.dtype)
+            full[ack_rows] = values
+            return full[order]
+
+        pre_s = to_sorted(pre, 0)
+        post_s = to_sorted(post, 0)
+        dup_s = to_sorted(dup, False)
+        ooa_s = to_sorted(ooa, False)
+        adjust_s = to_sorted(adjust, False)
+
+        max_ack_s = group_ffill(post_s, ack_s, group_s, self.max_ack[flow_s])
+        # for a data packet max_ack is the one left by the last ack of the flow
+        normal_s = max_seq_s - np.where(ack_s, pre_s, max_ack_s) + PKT_SIZE
+
+        bif_s = normal_s.copy()
+        loss_s = normal_s.copy()
+        # if we have received a duplicate ack then we need to reduce the bytes in flight by packet size
+        for j in np.flatnonzero(adjust_s).tolist():
+            if first_s[j]:
+                loss_s[j] = self.last_bif[flow_s[j]] - PKT_SIZE
+            else:
+                loss_s[j] = bif_s[j-1] - PKT_SIZE
+            bif_s[j] = min(normal_s[j], loss_s[j])
+        loss_bif_s = group_ffill(loss_s, ack_s, group_s, self.loss_bif[flow_s])
+
+        ids = flow_s[starts]
+        self.count[ids] += ends - starts
+        self.max_seq[ids] = max_seq_s[lasts]
+        self.max_ack[ids] = max_ack_s[lasts]
+        self.loss_bif[ids] = loss_bif_s[lasts]
+        self.last_bif[ids] = bif_s[lasts]
+        self.last_time[ids] = time_s[lasts]
+        ports = list(self.flows)
+        for g in range(len(starts)):
+            s = starts[g]
+            e = ends[g]
+            times = time_s[s:e]
+            # a retransmission is marked at the time of the previous sample of the flow
+            self.flows[ports[ids[g]]].add(times, bif_s[s:e], prev_time_s[s:e][retrans_s[s:e]],
+                                          times[ooa_s[s:e]], times[dup_s[s:e]])
+
+        if self.p == "y":
+            self.print_trace(order, ack_s, seq_s, ack[order], max_seq_s, pre_s, post_s, normal_s, bif_s, ooa_s, adjust_s, retrans_s)
+
+    def get_flows(self, as_list=True):
+        '''
+        The flows of the trace by port. With as_list=False the series are
+        NumPy arrays (float64 times, int64 windows) instead of lists.
+        '''
+        if self.p == "y":
+            print_summary(self.ooa, self.rp, self.ooaCount, self.rpCount)
+        for port, i in self.ids.items():
+            curr = self.flows[port]
+            curr.finish(as_list)
+            curr.max_seq = int(self.max_seq[i])
+            curr.max_ack = int(self.max_ack[i])
+            curr.last_seq = int(self.last_seq[i])
+            curr.last_ack = int(self.last_ack[i])
+            curr.loss_bif = int(self.loss_bif[i])
+        return self.flows
+
+    def print_trace(self, order, ack_s, seq_s, acks_s, max_seq_s, pre_s, post_s, normal_s, bif_s, ooa_s, adjust_s, retrans_s):
+        # Walks the packets in capture order, only used when printing is on
+        position = np.empty(len(order), dtype=np.int64)
+        position[order] = np.arange(len(order))
+        for j in position.tolist():
+            if ack_s[j] and adjust_s[j]:
+                print(green+"Duplicate Ack",int(acks_s[j]),"Max Ack",int(post_s[j]),"BIF",int(bif_s[j]))
+            elif ack_s[j]:
+                if ooa_s[j]:
+                    self.ooaCount+=1
+                    print(red+"Out of Order Ack",int(acks_s[j]),"Max Ack",int(pre_s[j]),"BIF",int(normal_s[j]))
+                    self.ooa.add(int(acks_s[j]))
+                else:
+                    print(black+"Inorder Ack",int(acks_s[j]),"Max Seq",int(max_seq_s[j]),"BIF",int(normal_s[j]))
+            elif retrans_s[j]:
+                self.rpCount+=1
+                self.rp.add(int(seq_s[j]))
+                print(pink+"Retransmitted Packet",int(seq_s[j]), "Next", int(max_seq_s[j])+PKT_SIZE, "BIF",int(bif_s[j]))
+            else:
+                print(blue+"Inorder Packet", int(seq_s[j]), "Next", int(max_seq_s[j])+PKT_SIZE, "BIF",int(bif_s[j]))
+
+
+def print_summary(ooa, rp, ooaCount, rpCount):
+    print("Out of Order Acks",len(ooa),"Retransmitted Packets",len(rp))
+    print("Count Out of Order Acks",ooaCount,"Retransmitted Packets",rpCount)
+    print("OOA",ooa,"RP",rp)
+
+
+def get_bif(cols, p="n"):
+    trace = BifTrace(p)
+    trace.add(cols)
+    return trace.get_flows()
+
+
+def stream_flows(name, p="n", chunksize=CHUNK_ROWS):
+    '''
+    Builds the flows of a csv reading chunksize rows at a time, the series
+    are returned as NumPy arrays.
+    '''
+    trace = BifTrace(p)
+    for cols in read_chunks(name, chunksize):
+        trace.add(cols)
+    return trace.get_flows(as_list=False)
+
+
+def process_flows(cc, dir,p="y", chunksize=None):
+    name = dir+cc+"-tcp.csv"
+    if not os.path.exists(name) and os.path.exists(dir+cc+".pcap"):
+        # the capture was not converted, it is read directly
+        name = dir+cc+".pcap"
+    print("Reading "+name+"...")
+    if name.endswith(".pcap"):
+        return get_bif(load_columns(name), p=p)
+    if chunksize is None and os.path.getsize(name) > STREAM_BYTES:
+        chunksize = CHUNK_ROWS
+    if chunksize is not None:
+        return stream_flows(name, p=p, chunksize=chunksize)
+    cols = load_columns(name)
+    return get_bif(cols, p=p)
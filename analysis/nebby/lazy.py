@@ -0,0 +1,31 @@
+'''
+Modules imported the first time they are used.
+
+The scripts need matplotlib only to plot (p="y"), pandas only to parse a csv
+that is not in nebby.cache yet and sklearn and scipy.stats only to train,
+but importing them is most of the time a run over one file takes.
+lazy("matplotlib.pyplot") returns a stand-in that imports the module on the
+first attribute access and then passes everything on to it.
+'''
+
+import importlib
+
+
+class LazyModule:
+    __slots__ = ["name", "module"]
+
+    def __init__(self, name):
+        self.name = name
+        self.module = None
+
+    def __getattr__(self, attr):
+        if self.module is None:
+            self.module = importlib.import_module(self.name)
+        return getattr(self.module, attr)
+
+    def __repr__(self):
+        return "<lazy module %s%s>" % (self.name, "" if self.module is None else " (imported)")
+
+
+def lazy(name):
+    return LazyModule(name)
@@ -0,0 +1,110 @@
+'''
+Per-run cache of pipeline stages.
+
+The classification scripts run the same stage on a trace more than once
+(the BBR check and the feature extraction both smoothen the BiF of every
+file). Decorating a stage with @stage keeps its result, keyed by the
+function and its arguments, so the later call gets back the same series
+instead of reconstructing the trace again.
+
+Results are shared between callers and must not be modified in place.
+Calls with p="y" draw plots and are never cached. The cache holds at most
+NEBBY_MEMO_MB megabytes (default 512) and evicts the least recently used
+results first.
+'''
+
+import os
+import sys
+import inspect
+import functools
+from collections import OrderedDict
+
+import numpy as np
+
+MAX_BYTES = int(float(os.environ.get("NEBBY_MEMO_MB", "512"))*1024*1024)
+
+
+def sizeof(value):
+    '''
+    Rough size in bytes of a stage result.
+    '''
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (list, tuple)):
+        size = sys.getsizeof(value)
+        if len(value) == 0:
+            return size
+        if isinstance(value[0], (int, float, np.number)):
+            # lists of samples, all the items have the same size
+            return size + len(value)*sys.getsizeof(value[0])
+        return size + sum(sizeof(v) for v in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(sizeof(v) for v in value.values())
+    return sys.getsizeof(value)
+
+
+class StageCache:
+    def __init__(self, max_bytes=MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        if key not in self.entries:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return self.entries[key][0]
+
+    def put(self, key, value):
+        size = sizeof(value)
+        if size > self.max_bytes:
+            return
+        if key in self.entries:
+            self.bytes -= self.entries.pop(key)[1]
+        self.entries[key] = (value, size)
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            _, (_, old) = self.entries.popitem(last=False)
+            self.bytes -= old
+
+    def clear(self):
+        self.entries.clear()
+        self.bytes = 0
+
+    def forget(self, arg):
+        '''
+        Drops the results of the calls that had the string arg (a trace) as
+        an argument, for a long running process whose traces can change.
+        '''
+        for key in [k for k in self.entries if any(isinstance(v, str) and v == arg for _, v in k[1:])]:
+            self.bytes -= self.entries.pop(key)[1]
+
+
+cache = StageCache()
+
+
+def stage(fn):
+    '''
+    Caches the results of fn for the rest of the run. The plotting switch
+    `p` is not part of the key.
+    '''
+    sig = inspect.signature(fn)
+
+    @functools.wraps(fn)
+    def run(*args, **kwargs):
+        bound = sig.bind(*args, **kwargs)
+        bound.apply_defaults()
+        params = dict(bound.arguments)
+        if params.pop("p", None) == "y":
+            return fn(*args, **kwargs)
+        key = (fn.__qualname__,) + tuple(params.items())
+        value = cache.get(key)
+        if value is None:
+            value = fn(*args, **kwargs)
+            cache.put(key, value)
+        return value
+    return run
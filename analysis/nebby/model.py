@@ -0,0 +1,225 @@
+'''
+The trained models as one versioned bundle of NumPy arrays.
+
+The classifiers were pickles of sklearn objects (scaled_vals.txt,
+classifiers.txt, count_to_mp.txt in final/, cc_gp.txt in websites/), which
+need the sklearn version that wrote them and take sklearn to load. A bundle
+(model.npz next to them) holds the same models as plain arrays:
+
+    version                 the format, load_bundle() refuses newer ones
+    degrees                 the degrees of the degree classifiers
+    <d>/scaler/mean, scale  the StandardScaler of degree d
+    <d>/nb/classes, prior, theta, var
+                            the GaussianNB of degree d
+    <d>/labels, <d>/ccs     count_to_mp[d] (labels and their ccs)
+    <d>/keys, <d>/scaled/<key>
+                            scaled_vals[d] (the scaled training
+                            coefficients by cc, in the order of keys)
+    gp/ccs, gp/<cc>/mean, covar, count
+                            the Gaussian params (count when known)
+
+and loads into the same dicts the scripts used, with Scaler and NaiveBayes
+in place of the sklearn objects. Their transform, predict and predict_proba
+are plain NumPy and give what sklearn gives. The scripts load the bundle
+when there is one and the pickles otherwise, nebby.train writes both.
+
+Usage:
+python3 -m nebby.model export [model folder]
+    writes model folder/model.npz from the pickles in it
+python3 -m nebby.model check [model folder]
+    compares the bundle with the pickles
+'''
+
+import os
+import sys
+import pickle
+import numpy as np
+
+VERSION = 1
+BUNDLE = "model.npz"
+MODEL_DIR = os.environ.get("NEBBY_MODEL_DIR", ".")
+PICKLES = {"scaled_vals": "scaled_vals.txt", "classifiers": "classifiers.txt",
+           "count_to_mp": "count_to_mp.txt", "cc_gaussian_params": "cc_gp.txt"}
+
+
+class Scaler:
+    __slots__ = ["mean_", "scale_"]
+
+    def __init__(self, mean, scale):
+        self.mean_ = mean
+        self.scale_ = scale
+
+    def transform(self, x):
+        x = np.array(x, dtype="float64")
+        x -= self.mean_
+        x /= self.scale_
+        return x
+
+
+class NaiveBayes:
+    __slots__ = ["classes_", "class_prior_", "theta_", "var_"]
+
+    def __init__(self, classes, prior, theta, var):
+        self.classes_ = classes
+        self.class_prior_ = prior
+        self.theta_ = theta
+        self.var_ = var
+
+    def joint_log_likelihood(self, x):
+        x = np.asarray(x, dtype="float64")
+        n_ij = -0.5 * np.sum(np.log(2.0 * np.pi * self.var_), axis=1)
+        n_ij = n_ij - 0.5 * np.sum(((x[:, None, :] - self.theta_) ** 2) / self.var_, axis=2)
+        return np.log(self.class_prior_) + n_ij
+
+    def predict(self, x):
+        return self.classes_[np.argmax(self.joint_log_likelihood(x), axis=1)]
+
+    def predict_proba(self, x):
+        jll = self.joint_log_likelihood(x)
+        top = jll.max(axis=1, keepdims=True)
+        return np.exp(jll - (np.log(np.sum(np.exp(jll - top), axis=1, keepdims=True)) + top))
+
+
+def pack(scaled_vals=None, classifiers=None, count_to_mp=None, cc_gaussian_params=None):
+    '''
+    The arrays of a bundle with the given models.
+    '''
+    arrays = {"version": np.array(VERSION)}
+    degrees = sorted(classifiers.keys()) if classifiers else []
+    arrays["degrees"] = np.array(degrees, dtype=np.int64)
+    for d in degrees:
+        scaler, clf = scaled_vals[d]['scaler'], classifiers[d]
+        arrays["%d/scaler/mean" % d] = np.asarray(scaler.mean_, dtype="float64")
+        arrays["%d/scaler/scale" % d] = np.asarray(scaler.scale_, dtype="float64")
+        arrays["%d/nb/classes" % d] = np.asarray(clf.classes_)
+        arrays["%d/nb/prior" % d] = np.asarray(clf.class_prior_, dtype="float64")
+        arrays["%d/nb/theta" % d] = np.asarray(clf.theta_, dtype="float64")
+        arrays["%d/nb/var" % d] = np.asarray(clf.var_, dtype="float64")
+        arrays["%d/labels" % d] = np.array(list(count_to_mp[d].keys()), dtype=np.int64)
+        arrays["%d/ccs" % d] = np.array(list(count_to_mp[d].values()), dtype=str)
+        arrays["%d/keys" % d] = np.array(list(scaled_vals[d].keys()), dtype=str)
+        for key in scaled_vals[d]:
+            if key != 'scaler':
+                arrays["%d/scaled/%s" % (d, key)] = np.asarray(scaled_vals[d][key], dtype="float64")
+    if cc_gaussian_params:
+        arrays["gp/ccs"] = np.array(list(cc_gaussian_params.keys()), dtype=str)
+        for cc, params in cc_gaussian_params.items():
+            arrays["gp/%s/mean" % cc] = np.asarray(params['mean'], dtype="float64")
+            arrays["gp/%s/covar" % cc] = np.asarray(params['covar'], dtype="float64")
+            if 'count' in params:
+                arrays["gp/%s/count" % cc] = np.array(params['count'])
+    return arrays
+
+
+def save_bundle(path, **models):
+    tmp = path + ".%d.tmp" % os.getpid()
+    with open(tmp, "wb") as f:
+        np.savez(f, **pack(**models))
+    os.replace(tmp, path)
+
+
+def load_bundle(path):
+    '''
+    The models in the bundle at path, a dict with scaled_vals, classifiers
+    and count_to_mp (empty when it has no degree classifiers) and
+    cc_gaussian_params.
+    '''
+    models = {"scaled_vals": {}, "classifiers": {}, "count_to_mp": {}, "cc_gaussian_params": {}}
+    with np.load(path, allow_pickle=False) as npz:
+        if int(npz["version"]) > VERSION:
+            raise ValueError("%s is a model bundle of version %d, this code reads up to %d"
+                             % (path, int(npz["version"]), VERSION))
+        for d in npz["degrees"].tolist():
+            scaled = {}
+            for key in npz["%d/keys" % d].tolist():
+                if key == 'scaler':
+                    scaled[key] = Scaler(npz["%d/scaler/mean" % d], npz["%d/scaler/scale" % d])
+                else:
+                    scaled[key] = npz["%d/scaled/%s" % (d, key)]
+            models["scaled_vals"][d] = scaled
+            models["classifiers"][d] = NaiveBayes(npz["%d/nb/classes" % d], npz["%d/nb/prior" % d],
+                                                  npz["%d/nb/theta" % d], npz["%d/nb/var" % d])
+            models["count_to_mp"][d] = dict(zip(npz["%d/labels" % d].tolist(), npz["%d/ccs" % d].tolist()))
+        if "gp/ccs" in npz.files:
+            for cc in npz["gp/ccs"].tolist():
+                params = {'mean': npz["gp/%s/mean" % cc], 'covar': npz["gp/%s/covar" % cc]}
+                if "gp/%s/count" % cc in npz.files:
+                    params['count'] = int(npz["gp/%s/count" % cc])
+                models["cc_gaussian_params"][cc] = params
+    return models
+
+
+def load_pickles(folder):
+    models = {}
+    for name, f in PICKLES.items():
+        path = os.path.join(folder, f)
+        if os.path.exists(path):
+            with open(path, "rb") as fp:
+                models[name] = pickle.load(fp)
+    return models
+
+
+def get_model_dir(script):
+    # NEBBY_MODEL_DIR, or the folder of the script the models are next to
+    return os.environ.get("NEBBY_MODEL_DIR", os.path.dirname(os.path.abspath(script)))
+
+
+def load_models(folder=None, required=("scaled_vals", "classifiers", "count_to_mp")):
+    '''
+    The models of folder (NEBBY_MODEL_DIR, the current folder by default),
+    from its bundle when it has one and from the pickles otherwise. Raises
+    FileNotFoundError when the models in required are not there.
+    '''
+    folder = folder or MODEL_DIR
+    path = os.path.join(folder, BUNDLE)
+    if os.path.exists(path):
+        models = load_bundle(path)
+    else:
+        models = {"scaled_vals": {}, "classifiers": {}, "count_to_mp": {}, "cc_gaussian_params": {}}
+        models.update(load_pickles(folder))
+    missing = [name for name in required if not models[name]]
+    if missing:
+        raise FileNotFoundError("no %s in %s, looked for %s and %s"
+                                % (", ".join(missing), os.path.abspath(folder), BUNDLE,
+                                   ", ".join(PICKLES[name] for name in missing)))
+    return models
+
+
+def export(folder):
+    models = load_pickles(folder)
+    save_bundle(os.path.join(folder, BUNDLE), **models)
+    return models
+
+
+def check(folder):
+    pickles = load_pickles(folder)
+    bundle = load_bundle(os.path.join(folder, BUNDLE))
+    worst = 0
+    for d in pickles.get("classifiers", {}):
+        x = np.concatenate([v for k, v in pickles["scaled_vals"][d].items() if k != 'scaler'])
+        raw = pickles["scaled_vals"][d]['scaler'].inverse_transform(x)
+        raw = np.vstack([raw, raw*np.random.default_rng(d).uniform(0.5, 2, raw.shape)])
+        a = pickles["scaled_vals"][d]['scaler'].transform(raw)
+        b = bundle["scaled_vals"][d]['scaler'].transform(raw)
+        worst = max(worst, np.abs(a - b).max())
+        worst = max(worst, np.sum(pickles["classifiers"][d].predict(a) != bundle["classifiers"][d].predict(b)))
+        worst = max(worst, np.abs(pickles["classifiers"][d].predict_proba(a) - bundle["classifiers"][d].predict_proba(b)).max())
+        worst = max(worst, int(pickles["count_to_mp"][d] != bundle["count_to_mp"][d]))
+        worst = max(worst, int(list(pickles["scaled_vals"][d].keys()) != list(bundle["scaled_vals"][d].keys())))
+        print("degree %d: %d coefficients, transform, predict and predict_proba compared" % (d, len(raw)))
+    for cc, params in pickles.get("cc_gaussian_params", {}).items():
+        other = bundle["cc_gaussian_params"][cc]
+        worst = max(worst, np.abs(params['mean'] - other['mean']).max(), np.abs(params['covar'] - other['covar']).max())
+    print("largest difference with the pickles %.2e" % worst)
+    return worst
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print(__doc__[__doc__.find("Usage"):])
+        exit()
+    if sys.argv[1] == "export":
+        models = export(sys.argv[2])
+        print("wrote", os.path.join(sys.argv[2], BUNDLE), "with", ", ".join(k for k in models if models[k]))
+    else:
+        sys.exit(0 if check(sys.argv[2]) < 1e-12 else 1)
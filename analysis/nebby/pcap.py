@@ -0,0 +1,231 @@
+'''
+Reads a pcap capture straight into the columns the bif engine uses, without
+going through tshark and a -tcp.csv.
+
+The file is memory mapped, the record headers are walked once to find where
+every packet starts and the IPv4 / TCP header fields are then gathered for
+all packets at once with NumPy. The columns match what pcap2csv.sh writes:
+frame_time_rel is relative to the first packet, frame_len is the length on
+the wire and seq / ack are relative to the start of the connection like
+tshark shows them (the SYN has seq 0, a connection picked up halfway starts
+at 1). Packets that are not IPv4 have empty addresses and packets that are
+not TCP have empty ports and TCP fields, as in the csv.
+
+Supported link types are Ethernet (with 802.1Q tags), raw IP, Linux cooked
+capture (v1 and v2) and BSD loopback, in classic pcap files with micro or
+nanosecond timestamps. pcapng is not supported, tshark -F pcap converts it.
+
+Usage (prints the flows found in the capture):
+python3 -m nebby.pcap capture.pcap
+'''
+
+import sys
+import mmap
+import struct
+import numpy as np
+
+# link type -> length of the link header (None means the header is parsed per packet)
+link_headers = {0: 4, 1: None, 12: 0, 14: 0, 101: 0, 113: 16, 276: 20}
+
+ETH_IP = 0x0800
+ETH_VLAN = 0x8100
+TH_SYN = 0x02
+TH_ACK = 0x10
+
+
+def read_header(buf):
+    magic = bytes(buf[:4])
+    if magic in (b"\xd4\xc3\xb2\xa1", b"\x4d\x3c\xb2\xa1"):
+        endian = "<"
+    elif magic in (b"\xa1\xb2\xc3\xd4", b"\xa1\xb2\x3c\x4d"):
+        endian = ">"
+    else:
+        raise ValueError("not a pcap file (pcapng has to be converted with tshark -F pcap)")
+    nano = magic in (b"\x4d\x3c\xb2\xa1", b"\xa1\xb2\x3c\x4d")
+    linktype = struct.unpack_from(endian+"I", buf, 20)[0] & 0xffff
+    if linktype not in link_headers:
+        raise ValueError("unsupported link type %d" % linktype)
+    return endian, nano, linktype
+
+
+def read_records(buf, endian):
+    '''
+    Walks the record headers, returns the timestamps (seconds and fraction),
+    captured and original lengths and the offset of every packet.
+    '''
+    record = struct.Struct(endian+"IIII")
+    sec = []
+    frac = []
+    incl = []
+    orig = []
+    offset = []
+    pos = 24
+    end = len(buf)
+    while pos + 16 <= end:
+        s, f, i, o = record.unpack_from(buf, pos)
+        pos += 16
+        if pos + i > end:
+            break
+        sec.append(s)
+        frac.append(f)
+        incl.append(i)
+        orig.append(o)
+        offset.append(pos)
+        pos += i
+    return (np.array(sec, dtype=np.int64), np.array(frac, dtype=np.int64),
+            np.array(incl, dtype=np.int64), np.array(orig, dtype=np.int64),
+            np.array(offset, dtype=np.int64))
+
+
+def gather(data, pos, ok, size):
+    # big endian integers of `size` bytes at pos, 0 where ok is False
+    pos = np.where(ok, pos, 0)
+    value = np.zeros(len(pos), dtype=np.int64)
+    for k in range(size):
+        value = (value << 8) | data[pos + k]
+    return np.where(ok, value, 0)
+
+
+def get_network(data, offset, incl, linktype, endian):
+    '''
+    Offset of the IP header of every packet and whether it is IPv4.
+    '''
+    n = len(offset)
+    size = link_headers[linktype]
+    if linktype == 1:
+        kind = gather(data, offset + 12, incl >= 14, 2)
+        vlan = kind == ETH_VLAN
+        inner = gather(data, offset + 16, vlan & (incl >= 18), 2)
+        kind = np.where(vlan, inner, kind)
+        net = offset + np.where(vlan, 18, 14)
+        is_ip = kind == ETH_IP
+    elif linktype == 113:
+        net = offset + size
+        is_ip = gather(data, offset + 14, incl >= size, 2) == ETH_IP
+    elif linktype == 276:
+        net = offset + size
+        is_ip = gather(data, offset, incl >= size, 2) == ETH_IP
+    elif linktype == 0:
+        # the address family is in the byte order of the machine that wrote it
+        net = offset + size
+        family = np.zeros(n, dtype=np.int64)
+        ok = incl >= size
+        for k in range(4):
+            shift = 8*k if endian == "<" else 8*(3-k)
+            family |= np.where(ok, data[np.where(ok, offset + k, 0)].astype(np.int64) << shift, 0)
+        is_ip = family == 2
+    else:
+        net = offset + size
+        is_ip = np.ones(n, dtype=bool)
+    has_header = incl - (net - offset) >= 20
+    is_ip &= has_header
+    is_ip &= gather(data, net, has_header, 1) >> 4 == 4
+    return net, is_ip
+
+
+def relative_numbers(src, sport, dst, dport, seq, ack, flags):
+    '''
+    Sequence and ack numbers relative to the start of every direction of a
+    connection. A SYN sets the base of its direction, otherwise the first
+    packet of a direction (or the first ack for it) does, minus one.
+    '''
+    base = {}
+    rel_seq = []
+    rel_ack = []
+    for s, sp, d, dp, q, a, f in zip(src, sport, dst, dport, seq, ack, flags):
+        fwd = (s, sp, d, dp)
+        rev = (d, dp, s, sp)
+        if f & TH_SYN:
+            if not f & TH_ACK and fwd in base and base[fwd] != q:
+                # a new connection on the same ports
+                base.pop(rev, None)
+            base[fwd] = q
+        elif fwd not in base:
+            base[fwd] = q - 1
+        rel_seq.append((q - base[fwd]) & 0xffffffff)
+        if f & TH_ACK:
+            if rev not in base:
+                base[rev] = a - 1
+            rel_ack.append((a - base[rev]) & 0xffffffff)
+        else:
+            rel_ack.append(0)
+    return rel_seq, rel_ack
+
+
+def to_strings(values, ok, convert):
+    # object array of convert(value), NaN where not ok
+    out = np.full(len(values), np.nan, dtype=object)
+    uniques, codes = np.unique(values[ok], return_inverse=True)
+    table = np.array([convert(v) for v in uniques.tolist()] + [np.nan], dtype=object)
+    out[ok] = table[codes]
+    return out
+
+
+def ip_string(v):
+    return "%d.%d.%d.%d" % (v >> 24, (v >> 16) & 255, (v >> 8) & 255, v & 255)
+
+
+def read_columns(name):
+    '''
+    The columns of the capture, keyed and typed like flows.read_columns.
+    '''
+    with open(name, "rb") as f:
+        if f.seek(0, 2) < 24:
+            raise ValueError(name + " is too short to be a pcap file")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            endian, nano, linktype = read_header(buf)
+            sec, frac, incl, orig, offset = read_records(buf, endian)
+            data = np.frombuffer(buf, dtype=np.uint8)
+            cols = get_columns(data, sec, frac, incl, orig, offset, linktype, endian, nano)
+            del data
+    return cols
+
+
+def get_columns(data, sec, frac, incl, orig, offset, linktype, endian, nano):
+    n = len(offset)
+    if n > 0:
+        ns = (sec - sec[0]) * 10**9 + (frac - frac[0]) * (1 if nano else 1000)
+    else:
+        ns = np.zeros(0, dtype=np.int64)
+    cols = {"frame_time_rel": ns / 1e9, "frame_len": orig.astype("float64")}
+
+    net, is_ip = get_network(data, offset, incl, linktype, endian)
+    ihl = (gather(data, net, is_ip, 1) & 15) * 4
+    total = gather(data, net + 2, is_ip, 2)
+    fragment = gather(data, net + 6, is_ip, 2) & 0x1fff
+    proto = gather(data, net + 9, is_ip, 1)
+    src = gather(data, net + 12, is_ip, 4)
+    dst = gather(data, net + 16, is_ip, 4)
+    cols["ip_src"] = to_strings(src, is_ip, ip_string)
+    cols["ip_dest"] = to_strings(dst, is_ip, ip_string)
+
+    tcp = net + ihl
+    is_tcp = is_ip & (proto == 6) & (fragment == 0) & (incl - (tcp - offset) >= 20)
+    sport = gather(data, tcp, is_tcp, 2)
+    dport = gather(data, tcp + 2, is_tcp, 2)
+    seq = gather(data, tcp + 4, is_tcp, 4)
+    ack = gather(data, tcp + 8, is_tcp, 4)
+    doff = (gather(data, tcp + 12, is_tcp, 1) >> 4) * 4
+    flags = gather(data, tcp + 13, is_tcp, 1)
+    cols["src_port"] = to_strings(sport, is_tcp, str)
+    cols["dest_port"] = to_strings(dport, is_tcp, str)
+
+    rows = np.flatnonzero(is_tcp)
+    rel_seq, rel_ack = relative_numbers(src[rows].tolist(), sport[rows].tolist(), dst[rows].tolist(),
+                                        dport[rows].tolist(), seq[rows].tolist(), ack[rows].tolist(),
+                                        flags[rows].tolist())
+    cols["tcp_len"] = np.where(is_tcp, total - ihl - doff, np.nan)
+    cols["seq"] = np.full(n, np.nan)
+    cols["seq"][rows] = rel_seq
+    cols["ack"] = np.full(n, np.nan)
+    cols["ack"][rows] = rel_ack
+    return cols
+
+
+if __name__ == "__main__":
+    from nebby.flows import get_bif
+    flows = get_bif(read_columns(sys.argv[1]))
+    for port in flows:
+        times = flows[port]["times"]
+        print(port, flows[port]["serverip"], flows[port]["serverport"], len(times), "samples",
+              "%.2f" % (times[-1] - times[0]), "s")
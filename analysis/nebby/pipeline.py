@@ -0,0 +1,611 @@
+'''
+The stages from a trace to its fitted features and the BBR check, once for
+all the scripts.
+
+check_cc_file, check_cc_folder, test_website, train_model,
+define_cc_degree, bbr_check, bif_trace and the *_lakshay modules each
+carried a copy of get_window, plot_one_bt, getRed, get_degree and the rest,
+which had drifted apart. They import them from here now, so a change to a
+stage reaches every script and its bytecode is compiled once.
+
+A trace is named in one of two ways:
+    the path of the -tcp.csv of a website,
+        <folder>/<website>-<pre>-<post>-<bw>-<bf>-tcp.csv (path=None)
+    a training trace <cc>-<run>-<pre>-<post>-<bw>-<bf>..., read from the
+        measurement folder given as path
+
+The scripts differ in how a feature is normalized before the fits, they
+pass their normalize function (normalize, normalize_rtt or normalize_bdp)
+to get_feature_degree. Plots are only drawn with p="y", which is also the
+only time matplotlib is imported.
+'''
+
+import numpy as np
+
+from nebby.flows import process_flows
+from nebby.smooth import smoothen, get_fft_smoothening
+from nebby.fit import polyfit_all
+from nebby.sample import sample_data
+from nebby.features import FeatureRecord, rolling_mean, fit_records
+from nebby.store import load_records
+from nebby.bbr import getProbes, isBBR
+from nebby.memo import stage
+from nebby.lazy import lazy
+
+plt = lazy("matplotlib.pyplot")
+
+# positions of the delays, bandwidth and buffer in the name of a website trace
+pre_i=1
+post_i=2
+bw_i=3
+bf_i=4
+
+MAX_DEG=3
+# weight of the coefficients against the mse when the degree of a feature is chosen
+LAMBD=0.02
+ERROR_THRESHOLD=1
+
+GRIDS={1:(2,2), 2:(2,2), 4:(2,2), 6:(2,3), 9:(3,3), 12:(3,4), 15:(3,5), 16:(4,4), 20:(5,4), 24:(6,4), 30:(6,5), 36:(6,6), 40:(8,5), 42:(8,7), 49:(7,7)}
+
+
+def plot_d(ax, time, data, c, l, alpha=1):
+    ax.plot(time, data, color=c, lw=2, label = l,alpha=alpha)
+
+
+def split_path(f):
+    path = f.split("/")
+    file_name = path[-1][:-8]
+    folder_path = "/".join(path[:-1])
+    folder_path = folder_path + "/"
+    algo_cc = file_name
+    return algo_cc, folder_path
+
+
+def get_flow_stats(flows, keys=None):
+    '''
+    Prints a line per flow (only the ports in keys if given), returns the
+    number of flows.
+    '''
+    num=len(flows.keys())
+    print("FLOW STATISTICS: \nNumber of flows: ", num)
+    print("------------------------------------------------------------------------------")
+    print('%6s'%"port", '%15s'%"SrcIP", '%8s'%"SrcPort",  '%8s'%"duration",  '%8s'%"start",  '%8s'%"end", '%8s'%"Sent (B)", '%8s'%"Recv (B)",)
+    for k in flows.keys():
+        if keys is not None and int(k) not in keys:
+            continue
+        times = flows[k]["times"]
+        if len(times) == 0:
+            continue
+        print('%6s'%k, '%15s'%flows[k]["serverip"], '%8s'%flows[k]["serverport"], '%8s'%str('%.2f'%(times[-1]-times[0])), '%8s'%str('%.2f'%times[0]), '%8s'%str('%.2f'%times[-1]), '%8s'%flows[k]["max_seq"], '%8s'%flows[k]["max_ack"])
+    return num
+
+
+def show_flows(files, path, p="n", show=True, multi_graph=False, only_stats=False):
+    '''
+    Plots the bif trace of every flow of the traces in files (read from the
+    folder path), one figure per trace. Without show the figure is saved to
+    ../logs/results/<trace>.png. Returns the flows of every trace.
+    '''
+    all_flows = {}
+    for f in files:
+        algo_cc = f
+        print("==============================================================================")
+        print("opening trace " + path + algo_cc + "-tcp.csv...")
+        flows = process_flows(algo_cc, path, p=p)
+        all_flows[f] = flows
+        num = get_flow_stats(flows)
+        if only_stats:
+            continue
+        multi = multi_graph and num > 1
+        if multi:
+            g=num
+            while g<=49 and g not in GRIDS:
+                g+=1
+            size = GRIDS[g] if g in GRIDS else GRIDS[49]
+            fig, axs = plt.subplots(size[0], size[1])
+            for i in range(size[0]):
+                for j in range(size[1]):
+                    if i==size[0]-1:
+                        axs[i][j].set_xlabel("Time (s)")
+                    if j==0:
+                        axs[i][j].set_ylabel("Bytes in flight")
+            for counter, port in enumerate(flows.keys()):
+                ax = axs[counter%size[0]][(counter//size[0])%size[1]]
+                ax.scatter(flows[port]["times"], flows[port]["windows"], color="#858585")
+                ax.plot(flows[port]["times"], flows[port]["windows"], label=str(port), linestyle="solid")
+                ax.legend()
+            fig.set_size_inches(16, 12)
+        else:
+            plt.figure()
+            plt.xlabel("Time (s)")
+            plt.ylabel("Bytes in flight")
+            for port in flows.keys():
+                plt.plot(flows[port]["times"], flows[port]["windows"], label=str(port), linestyle="solid")
+                plt.scatter(flows[port]["times"], flows[port]["windows"], color="#858585")
+            plt.legend()
+        if show:
+            plt.show()
+        else:
+            plt.savefig("../logs/results/"+algo_cc+".png", dpi=600, bbox_inches='tight', pad_inches=0)
+            plt.close()
+    return all_flows
+
+
+def get_window(f,p,t=1,path=None):
+    '''
+    The bif trace of the flow with the most samples: data, time and the
+    retransmissions (and the out of order and duplicate acks with t=2).
+    '''
+    if path is None:
+        algo_cc, path = split_path(f)
+    else:
+        algo_cc = f
+    flows = process_flows(algo_cc, path,p=p)
+    use_port = 0
+    maxx = 0
+    for port in flows.keys():
+        if len(flows[port]['windows']) > maxx:
+            maxx = len(flows[port]['windows'])
+            use_port = port
+    data = flows[use_port]['windows']
+    time = flows[use_port]['times']
+    retrans = flows[use_port]['retrans']
+    OOA = flows[use_port]['OOA']
+    DA = flows[use_port]['DA']
+    if p == "y":
+        plt.plot(time, data)
+    if t==2:
+        return data, time, retrans, OOA, DA
+    return data, time, retrans
+
+
+def get_rtt(f, path=None):
+    # the rtt in seconds from the delays in the name of the trace
+    if path is None:
+        fs = f.split("/")[-1].split("-")
+        pre = int(fs[pre_i])
+        post = int(fs[post_i])
+    else:
+        fs = f.split("-")
+        if len(fs) < 4:
+            print(f"Warning: Filename '{f}' doesn't follow expected format.")
+            print("Using default values: predelay=0, postdelay=50")
+            pre = 0
+            post = 50
+        else:
+            pre = int(fs[2])
+            post = int(fs[3])
+    return float(((pre+post)*2))/1000
+
+
+@stage
+def plot_one_bt(f, p,t=1,path=None):
+    '''
+    The smoothened bif trace of f: time, data, the retransmissions and the rtt.
+    '''
+    rtt = get_rtt(f, path)
+    ax = 0
+    if t==1:
+        data, time, retrans = get_window(f,"n",t,path)
+    elif t==2:
+        data, time, retrans, OOA, DA = get_window(f,"n",t,path)
+    if p == 'y':
+        fig, ax = plt.subplots(1,1, figsize=(15,8))
+        for x in retrans :
+            plt.axvline(x = x, color = 'm',alpha=0.5)
+        if t == 2:
+            for x in OOA :
+                plt.axvline(x = x, color = 'k', lw=2)
+            for x in DA:
+                plt.axvline(x = x, color = 'g', lw=0.5, alpha = 0.5)
+        plot_d(ax,time,data, "r","Original")
+    time, data = get_fft_smoothening(data, time, ax,rtt,p)
+    if p == 'y':
+        ax.plot(time, data, 'k', label='FFT smoothening', linewidth=1.5, alpha=0.5)
+    time, data = smoothen(time, data, rtt)
+    if p == 'y':
+        plot_d(ax, time, data, "b", "Smoothened",alpha=0.5)
+        ax.legend()
+        plt.title("FFT Smoothened vs Original")
+        plt.show()
+    return time, data, retrans, rtt
+
+
+def get_time_features(retrans,time,rtt):
+    # the stretches of at least 20 rtts between retransmissions
+    time_thresh = 20*rtt
+    features = []
+    for i in range(1, len(retrans)):
+        if retrans[i]-retrans[i-1] >= time_thresh:
+            features.append([retrans[i-1], retrans[i]])
+    # add a feature that finished when the experiment ends
+    if len(retrans)>0:
+        if time[-1] - retrans[-1] > 20*rtt :
+            features.append([retrans[-1],time[-1]])
+    return features
+
+
+def get_features(time, features):
+    # the features as [first, last] indices into time
+    left = 0
+    right = 0
+    feature_index = 0
+    in_feature = 0
+    index_features = []
+    while right < len(time) and feature_index < len(features):
+        if in_feature == 0 and time[right]>=features[feature_index][0]:
+            in_feature = 1
+            left = right
+        elif in_feature == 1 and time[right] > features[feature_index][1]:
+            in_feature = 0
+            index_features.append([left, right-1])
+            feature_index+=1
+        right+=1
+    if in_feature == 1:
+        index_features.append([left, right-1])
+    return index_features
+
+
+def get_plot_features(curr_file, p, path=None):
+    time, data, retrans, rtt = plot_one_bt(curr_file,p=p,t=1,path=path)
+    time_features = get_time_features(retrans,time,rtt)
+    features = get_features(time, time_features)
+    if p == 'y':
+        fig, ax = plt.subplots(1,1, figsize=(15,8))
+        plot_d(ax, time, data, "b", "Smoothened")
+        for ft in features :
+            ax.plot(time[ft[0]:ft[1]+1], data[ft[0]:ft[1]+1], color = 'r')
+        plt.title("Red features")
+        plt.show()
+    return time, data, features
+
+
+def adjust(time, data):
+    # from the lowest point of the first half to the highest of the second
+    try :
+        start = data.index(min(data[:int(len(data)/2)]))
+        end = data.index(max(data[int(len(data)/2):]))
+    except :
+        start = 0
+        end = len(data) - 1
+    if end - start <= 0:
+        return time, data
+    new_time = time[start:end+1]
+    new_data = data[start:end+1]
+    return new_time, new_data
+
+
+def sample_data_time(time, data, ss, m):
+    curr_time, curr_data = adjust(time, data)
+    new_time, new_data = sample_data(curr_time, curr_data, ss, m)
+    return new_time, new_data
+
+
+def get_red_records(curr_file, name, rtt, bdp, ss, p, ft_thresh, path=None, cc=None):
+    # the first ft_thresh features of a trace, resampled and smoothened
+    results = []
+    time, data, features = get_plot_features(curr_file, p=p, path=path)
+    count = 1
+    for ft in features :
+        if count > ft_thresh:
+            break
+        curr_time = time[ft[0]:ft[1]+1]
+        curr_data = data[ft[0]:ft[1]+1]
+        tr_time, tr_data = sample_data_time(curr_time, curr_data, ss, 1000)
+        tr_time = rolling_mean(tr_time)
+        tr_data = rolling_mean(tr_data)
+        if p == "y" :
+            print("Feature Length ", len(tr_data))
+            plt.plot(curr_time, curr_data, c='b', alpha = 0.5, lw = 5)
+            plt.plot(tr_time, tr_data, c='r', alpha = 1)
+            plt.scatter(tr_time, tr_data, c='k')
+            plt.title(name)
+            plt.show()
+        results.append(FeatureRecord(curr_file, name, count, rtt, bdp, tr_time, tr_data, cc=cc))
+        count+=1
+    return results
+
+
+def getRed_R(files,ss=125,p="y", ft_thresh=100):
+    '''
+    The features of website traces (paths of their -tcp.csv), named by
+    website.
+    '''
+    results = []
+    for curr_file in files :
+        print(curr_file)
+        file, folder_path = split_path(curr_file)
+        f_split = file.split("-")
+        v = f_split[0]
+        rtt = float((int(f_split[pre_i]) + int(f_split[post_i]))*2)/1000
+        bdp = float(rtt*1000*int(f_split[bw_i])*int(f_split[bf_i]))/8
+        results += get_red_records(curr_file, v, rtt, bdp, ss, p, ft_thresh)
+    return results
+
+
+def getRed(files,ss=125,p="y", ft_thresh=100, path=None):
+    '''
+    The features of training traces (cc-run-pre-post-bw-bf...), named
+    cc-run.
+    '''
+    results = []
+    for file in files :
+        f_split = file.split("-")
+        v = f_split[0] + "-" + f_split[1]
+        rtt = float((int(f_split[2]) + int(f_split[3]))*2)/1000
+        bdp = float(rtt*1000*int(f_split[4])*int(f_split[5]))/8
+        if p == "y":
+            print(file)
+            print("RTT",rtt,"BDP",bdp)
+        results += get_red_records(file, v, rtt, bdp, ss, p, ft_thresh, path, cc=f_split[0])
+    return results
+
+
+def normalize(time, data, rtt, bdp):
+    # time and data both scaled to [0, 10], what the classifiers in final/ use
+    new_time = time - min(time)
+    new_data = data - min(data)
+    new_time = (new_time/max(new_time))*10
+    new_data = (new_data/max(new_data))*10
+    return new_time, new_data
+
+
+def normalize_rtt(time, data, rtt, bdp):
+    # time in rtts, data scaled to [0, 10], what the websites/ models use
+    new_time = time - min(time)
+    new_data = data - min(data)
+    new_time = (new_time/rtt)
+    new_data = (new_data/max(new_data))*10
+    return new_time, new_data
+
+
+def normalize_bdp(time, data, rtt, bdp):
+    # time in rtts, data in percent of the bdp, what run-lakshay uses
+    new_time = (time/rtt)
+    new_data = (data/bdp)*100
+    new_time -=min(new_time)
+    new_data -=min(new_data)
+    return new_time, new_data
+
+
+def get_degree_all(time,data, p="n", max_deg=MAX_DEG):
+    p_net, mse_l = polyfit_all(time,data,max_deg)
+    if p =='y':
+        fit_net = [np.polyval(p_temp,time) for p_temp in p_net]
+        plt.plot(time, data,c='k',label='Truth')
+        for d in range(0, max_deg):
+            plt.plot(time, fit_net[d],label="degree" + str(d+1))
+        plt.legend()
+        plt.title("Fitting the different degree polynomial")
+        plt.show()
+    return max_deg,p_net, mse_l
+
+
+def get_degree(time,data, p="n", max_deg=MAX_DEG):
+    p_all, mse_l = polyfit_all(time,data,max_deg)
+    # No need of the constant term
+    p_net = [p_temp[0:-1] for p_temp in p_all]
+    if p =='y':
+        fit_net = [np.polyval(p_temp,time) for p_temp in p_all]
+        plt.plot(time, data,c='k',label='Truth')
+        for d in range(max_deg-1, max_deg):
+            plt.plot(time, fit_net[d],label="degree" + str(d+1))
+        plt.legend()
+        plt.show()
+    return max_deg,p_net[max_deg-1], mse_l
+
+
+def build_features_R(files,ss,p,ft_thresh,max_deg,normalize=normalize):
+    records = getRed_R(files,ss,p=p,ft_thresh=ft_thresh)
+    for r in records:
+        r.time, r.data = normalize(r.time, r.data, r.rtt, r.bdp)
+    return fit_records(records, max_deg)
+
+
+def get_feature_degree_R(files,ss=225,p='n',ft_thresh=3,max_deg=MAX_DEG,normalize=normalize):
+    '''
+    The features of website traces with the fits of all degrees up to
+    max_deg, by website.
+    '''
+    params = {"features":"getRed_R", "ss":ss, "ft_thresh":ft_thresh, "max_deg":max_deg}
+    records = load_records(files, files, params, normalize,
+                           lambda fs: build_features_R(fs,ss,p,ft_thresh,max_deg,normalize), use=p!='y')
+    mp = {}
+    for r in records:
+        if p == 'y':
+            get_degree_all(r.time, r.data,p=p,max_deg=max_deg)
+        mp[r.name] = {
+        'data':r.data,
+        'time':r.time,
+        "max_deg":max_deg,
+        "p_net":r.p_net,
+        "mse_l":r.mse_l
+    }
+    return mp
+
+
+def build_features(files,ss,p,ft_thresh,max_deg,normalize=normalize,path=None):
+    records = getRed(files,ss,p=p,ft_thresh=ft_thresh,path=path)
+    for r in records:
+        r.time, r.data = normalize(r.time, r.data, r.rtt, r.bdp)
+    return fit_records(records, max_deg)
+
+
+def get_feature_degree(files,ss=225,p='n',ft_thresh=3,max_deg=MAX_DEG,normalize=normalize,path=None,constant=False):
+    '''
+    The features of training traces with the coefficients of their fit of
+    degree max_deg, by cc-run. The constant term is left out unless
+    constant is set.
+    '''
+    params = {"features":"getRed", "ss":ss, "ft_thresh":ft_thresh, "max_deg":max_deg}
+    sources = files if path is None else [path+f for f in files]
+    records = load_records(files, sources, params, normalize,
+                           lambda fs: build_features(fs,ss,p,ft_thresh,max_deg,normalize,path), use=p!='y')
+    cc_mp = {}
+    for r in records:
+        if p == 'y':
+            print("Name :",r.name+str(r.index))
+            get_degree(r.time, r.data,p=p,max_deg=max_deg)
+        coeff = r.p_net[max_deg-1] if constant else r.p_net[max_deg-1][0:-1]
+        item = {'d':max_deg, 'coeff':coeff, 'error':r.mse_l, 'data':r.data, 'time':r.time}
+        if r.name not in cc_mp :
+            cc_mp[r.name] = []
+        cc_mp[r.name].append(item)
+    return cc_mp
+
+
+def getCC(files,cc_mp, p="n", path=None):
+    '''
+    The coefficients of the features of every trace in files, by cc.
+    '''
+    cc_coeff = {}
+    for file in files :
+        f_split = file.split("-")
+        cc = f_split[0]
+        version = f_split[1]
+        v = cc+"-"+version
+        if cc not in cc_coeff:
+            cc_coeff[cc] = []
+        if p == 'y':
+            plot_one_bt(file, p, path=path)
+        count = 0
+        temp = []
+        if v not in cc_mp.keys():
+            continue
+        for item in cc_mp[v]:
+            time = item['time']
+            data = item['data']
+            deg = item['d']
+            temp.append(item['coeff'])
+            count+=1
+            if p == 'y':
+                t = 1
+                while time[-1] > t:
+                    t*=2
+                xlim = t
+                while data[-1] > t:
+                    t*=2
+                ylim = t
+                lim = max(xlim, ylim)
+                names = [str(i) for i in range(1,deg+1)]
+                print([round(x,5) for x in item['coeff']])
+                plt.plot(time,data)
+                plt.plot(time, np.polyval(item['coeff'],time))
+                plt.xlim(0,lim)
+                plt.ylim(0,lim)
+                plt.title(str(count)+" " + cc)
+                plt.show()
+                # the change in error magnitude on a bar plot
+                plt.figure().set_figwidth(4)
+                plt.figure().set_figheight(2)
+                plt.bar(list(range(1,deg+1)), item['error'][0:deg], tick_label=names)
+                plt.show()
+        cc_coeff[cc].append(temp)
+    return cc_coeff
+
+
+def print_red(time,data,probe_index):
+    fig, ax = plt.subplots(1,1, figsize=(15,8))
+    ax.plot(time,data)
+    for p in probe_index:
+        ax.plot(time[p[0]:p[1]+1], data[p[0]:p[1]+1], color='r', lw=2)
+    plt.title("BBR Checking")
+    plt.show()
+
+
+def checkBBR(files,p="n"):
+    '''
+    "YES BBR", "MAYBE BBR", "NO BBR" or "NC <error>" for every website
+    trace, p="y" shows the probes that were found.
+    '''
+    classi = []
+    for f in files:
+        file_name = f.split("/")[-1]
+        para = file_name.split("-")
+        rtt = int(para[2])*2
+        bw = int(para[3])
+        bf = int(para[4])
+        bdp = float(bw*rtt*bf)/8
+        try:
+            time, data, retrans,rtt = plot_one_bt(f,p="n",t=1)
+            probe_index = getProbes(time, data, rtt, bdp, bw)
+            if p=="y":
+                print_red(time, data, probe_index)
+            classi.append(isBBR(time, data, probe_index, rtt, bw))
+        except Exception as ex:
+            template = "An exception of type {0} occurred. Arguments:\n{1!r}"
+            message = template.format(type(ex).__name__, ex.args)
+            new_message = "NC " + message
+            classi.append(new_message)
+    return classi
+
+
+def getDivision(classi, test_files):
+    yes = []
+    no = []
+    maybe = []
+    nan = {}
+    for i in range(len(classi)):
+        if classi[i] == "YES BBR":
+            yes.append(test_files[i])
+        elif classi[i] == "NO BBR":
+            no.append(test_files[i])
+        elif classi[i] == "MAYBE BBR":
+            maybe.append(test_files[i])
+        else:
+            nan[test_files[i]] = classi[i]
+    return yes, no,maybe, nan
+
+
+def get_errors(p_net, mse_l, lambd=LAMBD):
+    '''
+    The regularization loss (degree * sum of the coefficients * lambd) and
+    the total error (mse + loss) of the fit of every degree.
+    '''
+    loss = [(i+1)*sum(p_net[i])*lambd for i in range(len(mse_l))]
+    return loss, [loss[i]+mse_l[i] for i in range(len(mse_l))]
+
+
+def getBestDegree(nmp, p="y", lambd=LAMBD, error_threshold=ERROR_THRESHOLD):
+    '''
+    The degree with the lowest total error for every website of nmp (from
+    get_feature_degree_R) and its coefficients. The ones whose error is
+    above error_threshold are returned separately (None keeps them all).
+    '''
+    results = {}
+    too_much_error = {}
+    for name in nmp.keys():
+        data = nmp[name]['data']
+        time = nmp[name]['time']
+        max_deg = nmp[name]['max_deg']
+        p_net = [np.array(coeff) for coeff in nmp[name]['p_net']]
+        mse_l = nmp[name]['mse_l']
+        if p == "y":
+            plt.plot(time, data,c='k',label='Truth')
+            for d in range(0, max_deg):
+                fit_net = np.polyval(p_net[d],time)
+                plt.plot(time, fit_net,label="degree" + str(d+1))
+            plt.legend()
+            plt.show()
+        loss, errors = get_errors(p_net, mse_l, lambd)
+        if p == "y":
+            names = ["degree "+str(d+1) for d in range(0, max_deg)]
+            print("loss", loss)
+            print("mse", mse_l)
+            plt.title("Error with respect to polynomial fit")
+            plt.bar(names,mse_l,color='blue',width=0.4,label="mse")
+            plt.bar(names,loss,bottom=mse_l,color='maroon',width=0.4,label="reg_loss")
+            plt.legend()
+            plt.show()
+        deg = errors.index(min(errors))+1
+        current_cc = name.split("-")[0]
+        fit = {
+            'deg':deg,
+            'coeff':p_net[deg-1],
+            'error':errors[deg-1]
+        }
+        if error_threshold is not None and errors[deg-1] > error_threshold:
+            too_much_error[current_cc] = fit
+        else:
+            results[current_cc] = fit
+    return results, too_much_error
@@ -0,0 +1,27 @@
+'''
+Runs the per-file work of a script over a pool of processes.
+
+The scripts keep their stages as plain functions at module level without a
+__main__ guard, so the workers are forked from the running script rather
+than started fresh (which would run the whole script again in every
+worker). Where fork is not available the files are processed serially.
+'''
+
+import multiprocessing as mp
+import numpy as np
+
+
+def init_worker():
+    # forked workers would otherwise all draw the same random samples
+    np.random.seed()
+
+
+def map_files(fn, files, jobs):
+    '''
+    Returns [fn(f) for f in files], computed by `jobs` worker processes.
+    '''
+    if jobs <= 1 or len(files) <= 1 or "fork" not in mp.get_all_start_methods():
+        return [fn(f) for f in files]
+    ctx = mp.get_context("fork")
+    with ctx.Pool(min(jobs, len(files)), initializer=init_worker) as pool:
+        return pool.map(fn, files, chunksize=1)
@@ -0,0 +1,91 @@
+'''
+Resampling of a feature on Chebyshev-like points before the fits.
+
+The feature is read at ss of the m times of a uniform grid over it, picked
+as round((cos(x)+1)*(m-1)/2) for angles x in [0, pi] so that the ends are
+sampled more densely than the middle. The value at a time is the sample at
+that time when there is one (to 6 decimals) and otherwise the average of
+the two samples around it, the first and the last samples are added at the
+ends. All of it is done with searchsorted on the time axis, and
+sample_batch() does a list of features in one call.
+
+The angles come from NEBBY_SAMPLE:
+    random      np.random.uniform (the default), the same draws as the
+                scripts always made, so np.random.seed gives the same points
+    chebyshev   the ss Chebyshev nodes (2k+1)pi/2ss, the same points on
+                every run and in every process
+    <integer>   uniform angles from a generator with that seed, the same
+                points for every feature
+'''
+
+import os
+import math
+import numpy as np
+
+SAMPLE = os.environ.get("NEBBY_SAMPLE", "random")
+
+
+def get_angles(ss, count=None, mode=None):
+    '''
+    ss angles in [0, pi], an array of count rows of them if count is given.
+    '''
+    mode = SAMPLE if mode is None else mode
+    shape = ss if count is None else (count, ss)
+    if mode == "random":
+        # a (count, ss) draw takes the same numbers as count draws of ss in a row
+        return np.random.uniform(0, math.pi, shape)
+    if mode == "chebyshev":
+        x = (2*np.arange(ss) + 1)*math.pi/(2*ss)
+    else:
+        x = np.random.RandomState(int(mode)).uniform(0, math.pi, ss)
+    return x if count is None else np.tile(x, (count, 1))
+
+
+def get_indices(x, m):
+    # sorted positions on a grid of m points for the angles x
+    tr_x = np.cos(x)
+    tr_x += 1
+    tr_x *= (m-1)/2
+    return np.sort(np.round(tr_x).astype(np.int64), axis=-1)
+
+
+def same_time(t, c):
+    # round(t, 6) == round(c, 6) like Python rounds, only close times can be equal
+    same = np.zeros(len(t), dtype=bool)
+    near = np.flatnonzero(np.abs(t - c) < 2e-6)
+    same[near] = [round(a, 6) == round(b, 6) for a, b in zip(t[near].tolist(), c[near].tolist())]
+    return same
+
+
+def resample(time, data, index, m):
+    '''
+    The feature at the grid points index (of a uniform grid of m times),
+    with the first and last samples added at the ends.
+    '''
+    time = np.asarray(time, dtype="float64")
+    data = np.asarray(data, dtype="float64")
+    n = len(time)
+    step = (time[n-1] - time[0])/m
+    tr_time = time[0] + index*step
+    i = np.searchsorted(time, tr_time, side="left")
+    c = time[i]
+    exact = same_time(tr_time, c) | (i == 0) | (i == n-1)
+    prev = np.maximum(i-1, 0)
+    new_time = np.where(exact, c, (time[prev] + c)/2)
+    new_data = np.where(exact, data[i], (data[prev] + data[i])/2)
+    return np.r_[time[0], new_time, time[n-1]], np.r_[data[0], new_data, data[n-1]]
+
+
+def sample_data(time, data, ss, m):
+    return resample(time, data, get_indices(get_angles(ss), m), m)
+
+
+def sample_batch(times, datas, ss, m):
+    '''
+    sample_data for a list of features, returns two arrays with a row of
+    ss+2 points per feature.
+    '''
+    index = get_indices(get_angles(ss, len(times)), m)
+    out = [resample(t, d, k, m) for t, d, k in zip(times, datas, index)]
+    return (np.array([o[0] for o in out]).reshape(len(out), ss+2),
+            np.array([o[1] for o in out]).reshape(len(out), ss+2))
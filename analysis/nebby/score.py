@@ -0,0 +1,126 @@
+'''
+Densities of the coefficients of websites under the Gaussian params of the
+ccs (cc_gp.txt, see nebby.train).
+
+scipy.stats.multivariate_normal.pdf(x, mean, covar, allow_singular=True)
+takes the eigendecomposition of the covariance on every call. GaussianScorer
+does it once per cc when the params are loaded and keeps what comes out of
+it, with the same cutoff for small eigenvalues as scipy: the whitening
+matrix (the square root of the pseudo-inverse), the rank, the log
+pseudo-determinant and the directions outside the support (where the
+density is 0). The ccs are grouped by their number of coefficients and all
+the websites of a group are scored against all its ccs with one einsum.
+
+Usage (checks the densities against scipy on draws from every cc):
+python3 -m nebby.score [cc_gp file]
+'''
+
+import sys
+import time
+import pickle
+import numpy as np
+
+LOG_2PI = np.log(2*np.pi)
+
+
+def get_factors(covar, k):
+    # what scipy.stats._multivariate._PSD computes
+    s, u = np.linalg.eigh(np.reshape(covar, (k, k)))
+    eps = 1e6*np.finfo("float64").eps*np.max(np.abs(s))
+    if np.min(s) < -eps:
+        raise ValueError("the covariance is not positive semidefinite")
+    keep = s > eps
+    s_pinv = np.zeros(k)
+    s_pinv[keep] = 1/s[keep]
+    outside = np.zeros((k, k))
+    outside[:, :k-keep.sum()] = u[:, ~keep]
+    return u*np.sqrt(s_pinv), int(keep.sum()), np.sum(np.log(s[keep])), outside, 1e3*eps
+
+
+class GaussianScorer:
+    __slots__ = ["groups"]
+
+    def __init__(self, cc_gaussian_params):
+        by_size = {}
+        for cc in cc_gaussian_params:
+            k = np.size(cc_gaussian_params[cc]['mean'])
+            if k not in by_size:
+                by_size[k] = []
+            by_size[k].append(cc)
+        self.groups = {}
+        for k, ccs in by_size.items():
+            factors = [get_factors(cc_gaussian_params[cc]['covar'], k) for cc in ccs]
+            rank = np.array([f[1] for f in factors])
+            self.groups[k] = {
+                'ccs': ccs,
+                'mean': np.array([np.reshape(cc_gaussian_params[cc]['mean'], -1) for cc in ccs], dtype="float64"),
+                'whiten': np.array([f[0] for f in factors]),
+                'norm': -0.5*(rank*LOG_2PI + np.array([f[2] for f in factors])),
+                'singular': rank < k,
+                'outside': np.array([f[3] for f in factors]),
+                'eps': np.array([f[4] for f in factors]),
+            }
+
+    def logpdf(self, coeffs, k):
+        '''
+        Log densities of the rows of coeffs (k coefficients each) under the
+        ccs with k coefficients, one column per cc of group k.
+        '''
+        g = self.groups[k]
+        dev = np.asarray(coeffs, dtype="float64").reshape(-1, 1, k) - g['mean']
+        z = np.einsum("wck,ckj->wcj", dev, g['whiten'])
+        out = g['norm'] - 0.5*np.einsum("wcj,wcj->wc", z, z)
+        if g['singular'].any():
+            residual = np.linalg.norm(np.einsum("wck,ckj->wcj", dev, g['outside']), axis=-1)
+            out[(residual >= g['eps']) & g['singular']] = -np.inf
+        return out
+
+    def score(self, coeffs):
+        '''
+        For every coefficient array in coeffs, the ccs with as many
+        coefficients and its densities under them.
+        '''
+        sizes = np.array([np.size(c) for c in coeffs], dtype=np.int64)
+        out = [([], np.zeros(0))]*len(coeffs)
+        for k in np.unique(sizes).tolist():
+            if k not in self.groups:
+                continue
+            index = np.flatnonzero(sizes == k).tolist()
+            density = np.exp(self.logpdf(np.array([np.reshape(coeffs[i], -1) for i in index]), k))
+            for row, i in enumerate(index):
+                out[i] = (self.groups[k]['ccs'], density[row])
+        return out
+
+
+def check(path, count=2000):
+    from scipy.stats import multivariate_normal as mvn
+    cc_gp = pickle.load(open(path, "rb"))
+    rng = np.random.default_rng(0)
+    coeffs = []
+    for cc in cc_gp:
+        mean = np.reshape(cc_gp[cc]['mean'], -1)
+        covar = np.reshape(cc_gp[cc]['covar'], (len(mean), len(mean)))
+        coeffs += list(rng.multivariate_normal(mean, covar*rng.uniform(0.5, 4), count//len(cc_gp)))
+    start = time.perf_counter()
+    expected = []
+    for c in coeffs:
+        expected.append([mvn.pdf(c, mean=cc_gp[cc]['mean'], cov=cc_gp[cc]['covar'], allow_singular=True)
+                         for cc in cc_gp if np.size(cc_gp[cc]['mean']) == len(c)])
+    loop_time = time.perf_counter() - start
+    start = time.perf_counter()
+    scores = GaussianScorer(cc_gp).score(coeffs)
+    batch_time = time.perf_counter() - start
+    worst = 0
+    order = 0
+    for e, (ccs, density) in zip(expected, scores):
+        e = np.array(e)
+        worst = max(worst, np.max(np.abs(density - e)/np.maximum(e, 1e-300)))
+        order += np.argmax(e) != np.argmax(density)
+    print("%d coefficient arrays against %d ccs" % (len(coeffs), len(cc_gp)))
+    print("scipy per pair %.3f s, batched %.4f s" % (loop_time, batch_time))
+    print("largest relative difference %.2e, %d best ccs differ" % (worst, order))
+    return max(worst, order)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if check(sys.argv[1] if len(sys.argv) > 1 else "cc_gp.txt") < 1e-6 else 1)
@@ -1,7 +1,24 @@
+'''
+Matching the flows of a trace with the requests the browser made for them.
+
+The requests come from the HAR of the page load, the connection ids and
+their ports from the chrome netlog. get_port_rq_summary puts them together
+with the flows of nebby.flows.process_flows, whose last_ack (the last ack
+the host sent, as captured) is the size a flow carried.
+
+Usage:
+python3 semantics-perflow.py trace_name
+    reads ../logs/<trace_name>.json, .har and ../measurements/<trace_name>-tcp.csv
+'''
+
 from datetime import datetime 
 import textwrap
-import matplotlib.pyplot as plt
 import sys, os
+
+from nebby.lazy import lazy
+
+plt = lazy("matplotlib.pyplot")
+
 def blockPrint():
     sys.stdout = open(os.devnull, 'w')
 
@@ -117,7 +134,6 @@ def get_long_url(url, p):
 def get_cid_port_mp(events):
     cid_groupid_mp  = {}
     cid_port_mp = {}
-    port_groupid_mp = {}
     for event in events:
         if event['source']['type'] == 5 and ("params" in event) :
             if "group_id" in event['params'] :
@@ -0,0 +1,229 @@
+'''
+Classification server, so traces can be classified without starting a
+python3 check_cc_file.py for each of them.
+
+The server starts once: it imports the pipeline, loads the models and forks
+`jobs` worker processes. The workers keep their stage cache (nebby.memo)
+and the parsed csvs (nebby.cache) between requests. Every request handler
+runs in its own thread and hands its traces to the pool, so up to `jobs`
+traces are classified at the same time. A trace is classified the way
+final/check_cc_file.py does it and the answer is JSON:
+
+    {"results": [{"trace": ..., "bbr": "YES BBR", "verdict": "BBR"}, ...]}
+
+verdict is BBR, the name of a cc in capitals (CUBIC, RENO, ...) or NAN with
+the reason in "reason". degree is the degree of the polynomial the cc was
+chosen with.
+
+Requests:
+GET  /health
+GET  /classify?path=trace_path[&path=...]
+POST /classify  {"paths": [trace_path, ...]}
+POST /classify?name=<website>-<pre>-<post>-<bw>-<bf>-tcp.csv  (body: the csv)
+    the trace is written to a temporary folder under name, which gives the
+    rtt and bdp like the name of a trace path does
+
+Usage:
+python3 -m nebby.serve [--port N | --socket path] [--jobs N] [--models folder]
+    serves on localhost:8642 by default, with the models of final/ (or of
+    NEBBY_MODEL_DIR)
+curl 'localhost:8642/classify?path=/abs/path/t.co-0-50-200-2-tcp.csv'
+curl --data-binary @t.co-0-50-200-2-tcp.csv 'localhost:8642/classify?name=t.co-0-50-200-2-tcp.csv'
+'''
+
+import os
+import sys
+import json
+import shutil
+import signal
+import socketserver
+import tempfile
+import multiprocessing as mp
+from multiprocessing.pool import ThreadPool
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import numpy as np
+
+from nebby import memo
+from nebby import cache
+from nebby.pipeline import checkBBR, get_feature_degree_R, getBestDegree
+from nebby.model import load_models
+from nebby.pool import init_worker
+
+PORT = 8642
+MODEL_DIR = os.environ.get("NEBBY_MODEL_DIR",
+                           os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "final"))
+# how far (in standard deviations) a scaled coefficient may be from the training ones
+OUTLIER_THRESH = {1: 3, 2: 10, 3: 3}
+
+# set before the workers are forked, so they all start with the models loaded
+models = None
+# the (path, size, mtime) each worker last classified a path with
+seen = {}
+
+
+def classify(f, models):
+    '''
+    The verdict on the trace at path f, what final/check_cc_file.py prints.
+    '''
+    classi = checkBBR([f],"n")[0]
+    result = {"trace": f, "bbr": classi}
+    if classi == "YES BBR" or classi == "MAYBE BBR":
+        result["verdict"] = "BBR"
+        return result
+    if classi != "NO BBR":
+        result["verdict"] = "NAN"
+        result["reason"] = classi
+        return result
+    web_mp = get_feature_degree_R([f],ss=225,p="n",ft_thresh=1,max_deg=3)
+    web_cc_mp, too_much_error = getBestDegree(web_mp,p="n")
+    if len(web_cc_mp) == 0:
+        result["verdict"] = "NAN"
+        if len(too_much_error) > 0:
+            result["reason"] = "High error while fitting polynomial"
+        else:
+            result["reason"] = "No feature long enough to fit"
+        return result
+    web = list(web_cc_mp.keys())[0]
+    degree = web_cc_mp[web]['deg']
+    result["degree"] = degree
+    scaled = np.array(models["scaled_vals"][degree]['scaler'].transform([web_cc_mp[web]['coeff'][0:degree]]))
+    if np.any(np.abs(scaled[0][0:degree]) > OUTLIER_THRESH[degree]):
+        result["verdict"] = "NAN"
+        result["reason"] = "A polynomial fit with degree %d but not close to any CCs" % degree
+        return result
+    estimates = models["classifiers"][degree].predict(scaled)
+    result["verdict"] = models["count_to_mp"][degree][estimates[0]].upper()
+    return result
+
+
+def run_trace(f, temporary=False):
+    # runs in a worker, the results of a trace that changed since it was last seen are dropped first
+    if not temporary:
+        key = cache.get_key(f) if os.path.isfile(f) else None
+        if seen.get(f, key) != key:
+            memo.cache.forget(f)
+        seen[f] = key
+    try:
+        return classify(f, models)
+    except Exception as ex:
+        return {"trace": f, "verdict": "NAN", "reason": "%s: %s" % (type(ex).__name__, ex)}
+    finally:
+        if temporary:
+            memo.cache.forget(f)
+
+
+class Handler(BaseHTTPRequestHandler):
+    # set by serve()
+    pool = None
+    model_dir = None
+
+    def send_json(self, code, body):
+        data = json.dumps(body).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        # the client address of a unix socket is empty
+        sys.stderr.write("%s\n" % (format % args))
+
+    def classify_paths(self, paths):
+        missing = [f for f in paths if not os.path.isfile(f) and
+                   not (f.endswith("-tcp.csv") and os.path.isfile(f[:-len("-tcp.csv")] + ".pcap"))]
+        if len(paths) == 0 or len(missing) > 0:
+            self.send_json(404 if missing else 400, {"error": "no trace at " + ", ".join(missing) if missing else "no path given"})
+            return
+        jobs = [self.pool.apply_async(run_trace, (os.path.abspath(f),)) for f in paths]
+        self.send_json(200, {"results": [j.get() for j in jobs]})
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == "/health":
+            self.send_json(200, {"models": self.model_dir, "degrees": sorted(models["classifiers"].keys()),
+                                 "pid": os.getpid()})
+        elif url.path == "/classify":
+            self.classify_paths(parse_qs(url.query).get("path", []))
+        else:
+            self.send_json(404, {"error": "unknown path " + url.path})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path != "/classify":
+            self.send_json(404, {"error": "unknown path " + url.path})
+            return
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        name = parse_qs(url.query).get("name", [None])[0]
+        if name is None:
+            try:
+                paths = json.loads(body)["paths"]
+            except (ValueError, KeyError, TypeError):
+                self.send_json(400, {"error": 'expected {"paths": [...]} or ?name=<trace>-tcp.csv with the csv'})
+                return
+            self.classify_paths(paths)
+            return
+        name = os.path.basename(name)
+        if not name.endswith("-tcp.csv"):
+            self.send_json(400, {"error": "the name of an uploaded trace ends with -tcp.csv"})
+            return
+        folder = tempfile.mkdtemp(prefix="nebby-")
+        try:
+            f = os.path.join(folder, name)
+            with open(f, "wb") as fp:
+                fp.write(body)
+            result = self.pool.apply_async(run_trace, (f, True)).get()
+        finally:
+            shutil.rmtree(folder, ignore_errors=True)
+        result["trace"] = name
+        self.send_json(200, {"results": [result]})
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def serve(port=PORT, socket_path=None, jobs=1, model_dir=MODEL_DIR):
+    global models
+    models = load_models(model_dir)
+    if jobs > 1 and "fork" in mp.get_all_start_methods():
+        pool = mp.get_context("fork").Pool(jobs, initializer=init_worker)
+    else:
+        # one thread, the stage cache is not shared between threads
+        pool = ThreadPool(1)
+    Handler.pool = pool
+    Handler.model_dir = model_dir
+    if socket_path is not None:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        server = UnixHTTPServer(socket_path, Handler)
+        where = socket_path
+    else:
+        server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        where = "localhost:%d" % port
+    # stopping with kill (SIGTERM) closes the socket and the pool like Ctrl-C does
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    print("serving on", where, "with", jobs, "worker(s), models of", model_dir)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        pool.terminate()
+        if socket_path is not None and os.path.exists(socket_path):
+            os.remove(socket_path)
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    options = {"--port": PORT, "--socket": None, "--jobs": 1, "--models": MODEL_DIR}
+    while len(args) > 1 and args[0] in options:
+        options[args[0]] = args[1]
+        args = args[2:]
+    if len(args) > 0:
+        print(__doc__[__doc__.find("Usage"):])
+        exit()
+    serve(int(options["--port"]), options["--socket"], int(options["--jobs"]), options["--models"])
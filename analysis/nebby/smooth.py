@@ -0,0 +1,133 @@
+'''
+Smoothening of the bytes-in-flight trace.
+
+get_fft_smoothening() is the FFT low-pass that is applied first. By default
+it works on the samples as they are and takes them to be 2 ms apart, like
+the scripts always did (the trained models expect that). With a step (or
+NEBBY_FFT_STEP set, in seconds) the series is first interpolated onto a
+uniform grid with that step, frequencies above 1/rtt are removed with the
+real frequency axis of the grid and the result is read back at the
+original sample times, so the cutoff is the same whatever the packet rate.
+
+smoothen() averages the samples over a window of 2 RTTs that slides one
+sample at a time, like the two pointer loop the scripts used to carry
+(kept here as smoothen_loop). The window ends are found with searchsorted
+on the time axis and the running sum is built with a cumulative sum over
+the additions and removals in the same order as the loop, so the output is
+the same down to the last bit.
+'''
+
+import os
+import numpy as np
+from numpy.fft import rfft, rfftfreq, irfft
+
+LEGACY_STEP = 0.002
+FFT_STEP = float(os.environ["NEBBY_FFT_STEP"]) if os.environ.get("NEBBY_FFT_STEP") else None
+
+
+def get_fft(data, step=LEGACY_STEP):
+    yf = rfft(data)
+    xf = rfftfreq(len(data), step)
+    return yf, xf
+
+
+def lowpass(time, data, rtt, step):
+    '''
+    Low-pass at 1/rtt Hz on a uniform grid of the given step, returns the
+    filtered series at the original times.
+    '''
+    time = np.asarray(time, dtype="float64")
+    data = np.asarray(data, dtype="float64")
+    if len(time) < 2 or not time[-1] > time[0]:
+        return time, data
+    grid = time[0] + step*np.arange(int((time[-1] - time[0])/step) + 1)
+    yf, xf = get_fft(np.interp(grid, time, data), step)
+    yf[xf > 1/rtt] = 0
+    uniform = irfft(yf, n=len(grid))
+    return time, np.interp(time, grid, uniform)
+
+
+def get_fft_smoothening(data, time, ax, rtt, p, step=FFT_STEP):
+    '''
+    FFT low-pass of the bif series (ax and p are left from the plotting the
+    scripts used to do here). Without a step the transform is taken over the
+    samples: everything above the first bin past 1/rtt is dropped, and for an
+    odd number of samples the first one is lost, as before.
+    '''
+    if step is not None:
+        return lowpass(time, data, rtt, step)
+    yf, xf = get_fft(data)
+    above = np.flatnonzero(xf > 1/rtt)
+    thresh_ind = above[0] if len(above) > 0 else 0
+    yf[thresh_ind+1:] = 0
+    new_f_clean = irfft(yf)
+    start_len = len(time) - len(new_f_clean)
+    return time[start_len:], new_f_clean
+
+
+def smoothen_loop(time, data, rtt):
+    # Smoothening
+    left = 0
+    right = 0
+    run_sum = 0
+    avg_data = []
+    new_time = []
+    roll_time = time
+    roll_data = data
+    while right < len(roll_time):
+        while(right < len(roll_time) and (roll_time[right]-roll_time[left] < 2*rtt)):
+            run_sum+=roll_data[right]
+            right+=1
+        new_time.append(float(roll_time[right-1]+roll_time[left])/2)
+        avg_data.append(float(run_sum)/(right-left))
+        run_sum-=roll_data[left]
+        left+=1
+    return new_time, avg_data
+
+
+def window_ends(time, width):
+    '''
+    For every sample the first sample at least width after it, using the same
+    comparison as the loop (time[j]-time[i] < width).
+    '''
+    n = len(time)
+    end = np.searchsorted(time, time + width, side="left")
+    # searchsorted compares time[j] with time[i]+width, fix the few that round the other way
+    while True:
+        back = (end > 0) & ~(time[np.maximum(end-1, 0)] - time < width)
+        back &= end - 1 > np.arange(n)
+        ahead = (end < n) & (time[np.minimum(end, n-1)] - time < width)
+        if not back.any() and not ahead.any():
+            return end
+        end = end - back + ahead
+
+
+def smoothen(time, data, rtt):
+    time = np.asarray(time, dtype="float64")
+    n = len(time)
+    width = 2*rtt
+    if n == 0:
+        return [], []
+    if not width > 0 or np.any(time[1:] < time[:-1]):
+        # the window ends only move forward on a sorted time axis
+        return smoothen_loop(list(time), list(data), rtt)
+    data = np.asarray(data, dtype="float64")
+
+    # right end of the window of every left end, as the loop moves it
+    right = np.maximum.accumulate(window_ends(time, width))
+    # the loop stops after the first window that reaches the last sample
+    last = int(np.argmax(right == n))
+    right = right[:last+1]
+    left = np.arange(last+1)
+
+    # the running sum: sample j is added before the window it enters first and
+    # sample i is removed after window i, that order gives every position in ops
+    ops = np.zeros(n + last + 1)
+    added_at = np.searchsorted(right, np.arange(n), side="right")
+    ops[np.arange(n) + added_at] = data
+    ops[right + left] = -data[:last+1]
+    run_sum = np.cumsum(ops)[right + left - 1]
+
+    new_time = (time[right-1] + time[left])/2
+    avg_data = run_sum/(right - left)
+    return new_time.tolist(), avg_data.tolist()
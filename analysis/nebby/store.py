@@ -0,0 +1,146 @@
+'''
+On-disk store of the fitted features of every trace.
+
+With NEBBY_FEATURE_STORE set to a folder, the records that
+get_feature_degree / get_feature_degree_R build for a trace (normalized and
+fitted, see nebby.features) are written there as the columns of a
+FeatureTable, one npz file per trace and set of pipeline parameters. The
+next run that asks for the same trace with the same parameters loads them
+instead of rebuilding the bif trace, so retraining or re-scoring a corpus
+that was already processed only reads the store.
+
+A trace is identified like nebby.cache does it (path, size and mtime of its
+csv or pcap). The parameters are the ones given by the script (ss,
+ft_thresh, max_deg), the normalize function it uses and the settings that
+change the features: NEBBY_SAMPLE, NEBBY_FFT_STEP and the moving average
+window.
+
+With the default random sampling a stored trace keeps the points of the run
+that stored it, NEBBY_SAMPLE=chebyshev makes the stored features the same as
+the ones every run would compute.
+
+Usage (lists what is in the store):
+python3 -m nebby.store [store_path]
+'''
+
+import os
+import sys
+import hashlib
+import numpy as np
+
+from nebby import cache
+from nebby import sample
+from nebby import smooth
+from nebby import features
+from nebby.features import FeatureTable
+
+STORE_DIR = os.environ.get("NEBBY_FEATURE_STORE", "")
+VERSION = 1
+
+
+def code_key(fn):
+    # changes when the function is edited
+    code = fn.__code__
+    return hashlib.sha1(code.co_code + repr(code.co_consts).encode()).hexdigest()[:12]
+
+
+def get_params(params, normalize):
+    params = dict(params)
+    params["normalize"] = code_key(normalize)
+    params["sample"] = sample.SAMPLE
+    params["fft_step"] = smooth.FFT_STEP
+    params["window"] = features.WINDOW
+    return params
+
+
+def find_source(name):
+    # the file the trace is read from, like process_flows looks for it
+    for path in [name, name + "-tcp.csv", name + ".pcap"]:
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def store_path(source, params, folder):
+    source, size, mtime = cache.get_key(source)
+    key = repr((VERSION, source, size, mtime, sorted(params.items())))
+    return os.path.join(folder, hashlib.sha1(key.encode()).hexdigest() + ".npz"), source
+
+
+def load(source, params, folder=None):
+    '''
+    The stored records of the trace, None when they are not in the store.
+    '''
+    path, source = store_path(source, params, folder or STORE_DIR)
+    if not os.path.exists(path):
+        return None
+    try:
+        with np.load(path) as npz:
+            if int(npz["version"]) != VERSION or str(npz["source"]) != source:
+                return None
+            return FeatureTable({f: npz[f] for f in npz["fields"].tolist()}).records()
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def save(source, params, records, folder=None):
+    folder = folder or STORE_DIR
+    path, source = store_path(source, params, folder)
+    columns = FeatureTable.from_records(records, params.get("max_deg", 3)).columns
+    arrays = dict(columns)
+    arrays.update({"version": VERSION, "source": source, "params": repr(sorted(params.items())),
+                   "fields": np.array(list(columns.keys()))})
+    try:
+        os.makedirs(folder, exist_ok=True)
+        tmp = path + ".%d.tmp" % os.getpid()
+        with open(tmp, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(tmp, path)
+    except OSError:
+        pass
+
+
+def load_records(files, sources, params, normalize, compute, use=True):
+    '''
+    Records of all the files in order. The ones of files in the store are
+    loaded, compute(missing files) builds the others, which are then stored.
+    sources[i] is where files[i] is read from (None if it is not known, the
+    file is then always computed).
+    '''
+    if not STORE_DIR or not use:
+        return compute(files)
+    params = get_params(params, normalize)
+    found = {}
+    missing = []
+    for f, name in zip(files, sources):
+        source = find_source(name) if name is not None else None
+        records = load(source, params) if source is not None else None
+        if records is None:
+            missing.append(f)
+        else:
+            found[f] = records
+    if missing:
+        computed = compute(missing)
+        for f, name in zip(files, sources):
+            if f not in missing:
+                continue
+            found[f] = [r for r in computed if r.trace == f]
+            source = find_source(name) if name is not None else None
+            if source is not None:
+                save(source, params, found[f])
+    return [r for f in files for r in found[f]]
+
+
+if __name__ == "__main__":
+    folder = sys.argv[1] if len(sys.argv) > 1 else STORE_DIR
+    if not folder or not os.path.isdir(folder):
+        print("python3 -m nebby.store store_path (or set NEBBY_FEATURE_STORE)")
+        exit()
+    count = 0
+    for name in sorted(os.listdir(folder)):
+        if not name.endswith(".npz"):
+            continue
+        with np.load(os.path.join(folder, name)) as npz:
+            print("%-60s %3d features %s" % (str(npz["source"])[-60:], len(npz["index"]), str(npz["params"])))
+        count += 1
+    print(count, "traces in", folder)
@@ -0,0 +1,340 @@
+'''
+Training of the classifiers, all at once or by folding new traces into the
+trained ones.
+
+Both are trained on vals, the coefficients of the first feature of every
+training trace by cc (vals[cc][1], what getCoeff in websites/train_model.py
+returns and final/vals.txt holds).
+
+Gaussian params (websites/cc_gp.txt): the mean and covariance of every cc.
+update_gaussian_params() merges the mean and covariance of a new batch into
+the stored ones (the pairwise update of Chan et al.), for which it needs the
+number of traces behind them, kept as 'count'. Params saved before count
+was kept have to be trained again once.
+
+Degree classifiers (final/scaled_vals.txt, classifiers.txt, count_to_mp.txt):
+for every degree a StandardScaler of the coefficients of the ccs of that
+degree and a GaussianNB of the scaled coefficients, count_to_mp[degree]
+gives the cc of every label. scaled_vals[degree] also has the scaled
+coefficients of every cc (the ones in COMBINED together under 'combined').
+update_degree_models() folds new coefficients in with partial_fit: the
+scaler takes the new batch, the classes the GaussianNB has are moved to the
+new scale (a shift and a scale of every coefficient, so their means and
+variances follow exactly) and it then takes the new batch scaled. A cc that
+is new at its degree gets the next label.
+
+Before training, reject_outliers() drops the traces of a cc whose
+coefficients are too far from the others: their squared Mahalanobis
+distances from the mean are computed together (a Cholesky solve, or the
+pseudo-inverse when the covariance is singular) and the ones with a chi2
+p-value under the threshold are rejected.
+
+Trained in batches or all at once the models are the same up to rounding,
+python3 -m nebby.train check compares them on final/vals.txt (and the
+outliers against the distances computed one trace at a time).
+
+Usage:
+python3 -m nebby.train build [model folder] [vals file]
+    trains the degree classifiers of model folder on vals file
+python3 -m nebby.train update [model folder] [vals file]
+    folds vals file into them (and into model folder/vals.txt), both
+    write the pickles and model.npz (see nebby.model)
+python3 -m nebby.train check [model folder]
+'''
+
+import os
+import sys
+import copy
+import pickle
+import numpy as np
+
+from nebby.lazy import lazy
+from nebby.model import export
+
+stats = lazy("scipy.stats")
+naive_bayes = lazy("sklearn.naive_bayes")
+preprocessing = lazy("sklearn.preprocessing")
+
+COMBINED = ['dctcp', 'highspeed', 'lp', 'reno']
+MODEL_FILES = ["scaled_vals.txt", "classifiers.txt", "count_to_mp.txt"]
+
+
+def merge_moments(count, mean, covar, data):
+    '''
+    count, mean and covariance of count traces and the traces in data
+    together.
+    '''
+    data = np.asarray(data, dtype="float64").reshape(len(data), -1)
+    n = len(data)
+    batch_mean = data.mean(axis=0)
+    diff = data - batch_mean
+    delta = batch_mean - np.reshape(mean, -1)
+    total = count + n
+    moment = (np.reshape(covar, (len(delta), len(delta)))*(count-1) + diff.T.dot(diff)
+              + np.outer(delta, delta)*count*n/total)
+    new_mean = np.reshape(mean, -1) + delta*n/total
+    return total, new_mean.reshape(np.shape(mean)), (moment/(total-1)).reshape(np.shape(covar))
+
+
+def update_gaussian_params(cc_gaussian_params, vals):
+    '''
+    cc_gaussian_params with the first feature of the traces in vals added,
+    the ccs that are not in it yet get the mean and covariance of their
+    traces.
+    '''
+    params = dict(cc_gaussian_params)
+    for cc in vals:
+        # Taking the first feature only
+        if len(list(vals[cc].keys()))==0 :
+            continue
+        data = vals[cc][1]
+        if cc not in params:
+            params[cc] = {
+                'mean' : np.mean(data,axis=0),
+                'covar' : np.cov(data,rowvar=False),
+                'count' : len(data)
+            }
+            continue
+        if 'count' not in params[cc]:
+            raise ValueError("the params of %s do not have their count of traces, train them again" % cc)
+        count, mean, covar = merge_moments(params[cc]['count'], params[cc]['mean'], params[cc]['covar'], data)
+        params[cc] = {'mean':mean, 'covar':covar, 'count':count}
+    return params
+
+
+def mahalanobis(x, mean, covar):
+    '''
+    Squared Mahalanobis distances of the rows of x.
+    '''
+    diff = np.asarray(x, dtype="float64").reshape(len(x), -1) - np.reshape(mean, -1)
+    covar = np.reshape(covar, (diff.shape[1], diff.shape[1]))
+    try:
+        z = np.linalg.solve(np.linalg.cholesky(covar), diff.T)
+        return np.einsum("ij,ij->j", z, z)
+    except np.linalg.LinAlgError:
+        return np.einsum("ij,jk,ik->i", diff, np.linalg.pinv(covar, hermitian=True), diff)
+
+
+def mahalanobis_loop(x, mean, covar):
+    # what train_model.py did, one trace at a time
+    x_covar_inv = np.linalg.inv(np.reshape(covar, (len(x[0]), len(x[0]))))
+    x_diff = x - mean
+    return np.array([x_diff[i].dot(x_covar_inv).dot(x_diff[i]) for i in range(len(x_diff))])
+
+
+def reject_outliers(x, thresh=0.05, df=4):
+    '''
+    Indices of the rows of x (the coefficients of the traces of a cc) whose
+    distance from the others has a chi2 p-value under thresh, and the
+    distances. df is 4 whatever the degree, like train_model.py always had.
+    '''
+    x = np.asarray(x, dtype="float64").reshape(len(x), -1)
+    md = mahalanobis(x, x.mean(axis=0), np.cov(x, rowvar=False))
+    return np.flatnonzero(stats.chi2.sf(md, df) < thresh), md
+
+
+def get_batches(vals, cc_degree):
+    # the new coefficients of every degree by cc, in the order of cc_degree
+    batches = {}
+    for cc in cc_degree:
+        if cc not in vals or 1 not in vals[cc] or len(vals[cc][1]) == 0:
+            continue
+        degree = cc_degree[cc]
+        if degree not in batches:
+            batches[degree] = {}
+        batches[degree][cc] = np.array(vals[cc][1], dtype="float64").reshape(len(vals[cc][1]), degree)
+    return batches
+
+
+def rescale(x, old, new):
+    # scaled by old to scaled by new
+    return (x*old.scale_ + old.mean_ - new.mean_)/new.scale_
+
+
+def update_degree(degree, batch, scaled, clf, labels):
+    first = scaled is None
+    if first:
+        scaled = {}
+        clf = naive_bayes.GaussianNB()
+        labels = {}
+        old = None
+        scaler = preprocessing.StandardScaler()
+    else:
+        old = scaled['scaler']
+        scaler = copy.deepcopy(old)
+        clf = copy.deepcopy(clf)
+    label = dict((cc, i) for i, cc in labels.items())
+    for cc in batch:
+        if cc not in label:
+            label[cc] = max(labels.keys(), default=0) + 1
+            labels[label[cc]] = cc
+    x = np.concatenate(list(batch.values()))
+    y = np.concatenate([[label[cc]]*len(batch[cc]) for cc in batch])
+    scaler.partial_fit(x)
+    x_scaled = scaler.transform(x)
+
+    if first:
+        clf.partial_fit(x_scaled, y, classes=sorted(labels.keys()))
+    else:
+        # the classes to the new scale, the ccs new at this degree as empty classes
+        var = (clf.var_ - clf.epsilon_)*(old.scale_/scaler.scale_)**2
+        theta = rescale(clf.theta_, old, scaler)
+        count = clf.class_count_
+        new = [i for i in sorted(labels.keys()) if i not in clf.classes_]
+        if new:
+            clf.classes_ = np.r_[clf.classes_, new]
+            theta = np.vstack([theta, np.zeros((len(new), degree))])
+            var = np.vstack([var, np.zeros((len(new), degree))])
+            count = np.r_[count, np.zeros(len(new))]
+        # partial_fit takes out the epsilon of the batch before updating and puts it back after
+        batch_epsilon = clf.var_smoothing*np.var(x_scaled, axis=0).max()
+        clf.theta_, clf.var_, clf.class_count_ = theta, var + batch_epsilon, count
+        clf.partial_fit(x_scaled, y)
+        # the epsilon of all the coefficients, like a fit on all of them has
+        epsilon = clf.var_smoothing*(scaler.var_/scaler.scale_**2).max()
+        clf.var_ += epsilon - batch_epsilon
+        clf.epsilon_ = epsilon
+
+    out = {}
+    for key in scaled:
+        if key != 'scaler':
+            out[key] = rescale(scaled[key], old, scaler)
+    for cc in batch:
+        key = 'combined' if cc in COMBINED else cc
+        rows = scaler.transform(batch[cc])
+        out[key] = np.vstack([out[key], rows]) if key in out else rows
+    scaled = {key: out[key] for key in out if key != 'combined'}
+    scaled['scaler'] = scaler
+    if 'combined' in out:
+        scaled['combined'] = out['combined']
+    return scaled, clf, labels
+
+
+def update_degree_models(models, vals, cc_degree):
+    '''
+    models is (scaled_vals, classifiers, count_to_mp), empty dicts to train
+    from scratch, returns them with vals added.
+    '''
+    scaled_vals, classifiers, count_to_mp = [dict(m) for m in models]
+    batches = get_batches(vals, cc_degree)
+    for degree in sorted(batches.keys()):
+        scaled, clf, labels = update_degree(degree, batches[degree], scaled_vals.get(degree),
+                                            classifiers.get(degree), dict(count_to_mp.get(degree, {})))
+        scaled_vals[degree], classifiers[degree], count_to_mp[degree] = scaled, clf, labels
+    return scaled_vals, classifiers, count_to_mp
+
+
+def merge_vals(vals, new_vals):
+    out = {cc: {k: list(v) for k, v in vals[cc].items()} for cc in vals}
+    for cc in new_vals:
+        if cc not in out:
+            out[cc] = {}
+        for k, v in new_vals[cc].items():
+            out[cc][k] = out[cc].get(k, []) + list(v)
+    return out
+
+
+def load_models(folder):
+    return [pickle.load(open(os.path.join(folder, name), "rb")) for name in MODEL_FILES]
+
+
+def save_models(folder, models):
+    for name, model in zip(MODEL_FILES, models):
+        with open(os.path.join(folder, name), "wb") as f:
+            pickle.dump(model, f)
+    export(folder)
+
+
+def split_vals(vals, fraction):
+    # first part of every cc and the rest, the last cc only in the rest
+    first, rest = {}, {}
+    ccs = list(vals.keys())
+    for cc in ccs:
+        data = vals[cc][1]
+        k = 0 if cc == ccs[-1] else int(len(data)*fraction)
+        first[cc] = {1: data[:k]} if k else {}
+        rest[cc] = {1: data[k:]}
+    return first, rest
+
+
+def class_row(clf, labels, cc):
+    label = [i for i in labels if labels[i] == cc][0]
+    return list(clf.classes_).index(label)
+
+
+def check(folder):
+    vals = pickle.load(open(os.path.join(folder, "vals.txt"), "rb"))
+    cc_degree = pickle.load(open(os.path.join(folder, "cc_degree.txt"), "rb"))
+    full = update_degree_models(({}, {}, {}), vals, cc_degree)
+    worst = 0
+    stored = load_models(folder)
+    for degree in stored[1]:
+        worst = max(worst, np.abs(full[1][degree].theta_ - stored[1][degree].theta_).max(),
+                    np.abs(full[1][degree].var_ - stored[1][degree].var_).max())
+    print("trained all at once against the stored models: %.2e" % worst)
+
+    worst = 0
+    for fraction in [0.5, 0.9]:
+        first, rest = split_vals(vals, fraction)
+        models = update_degree_models(({}, {}, {}), first, cc_degree)
+        for k in range(0, 10):
+            part = {cc: {1: rest[cc][1][k::10]} for cc in rest}
+            models = update_degree_models(models, part, cc_degree)
+        for degree in full[1]:
+            a, b = full[1][degree], models[1][degree]
+            ccs = list(full[2][degree].values())
+            ia = [class_row(a, full[2][degree], cc) for cc in ccs]
+            ib = [class_row(b, models[2][degree], cc) for cc in ccs]
+            worst = max(worst, np.abs(a.theta_[ia] - b.theta_[ib]).max()/np.abs(a.theta_).max(),
+                        np.abs(a.var_[ia] - b.var_[ib]).max()/a.var_.max(),
+                        np.abs(a.class_count_[ia] - b.class_count_[ib]).max(),
+                        np.abs(full[0][degree]['scaler'].mean_ - models[0][degree]['scaler'].mean_).max(),
+                        np.abs(full[0][degree]['scaler'].scale_ - models[0][degree]['scaler'].scale_).max())
+            x = np.concatenate([v for k, v in full[0][degree].items() if k != 'scaler'])
+            pa = [full[2][degree][i] for i in a.predict(x)]
+            pb = [models[2][degree][i] for i in b.predict(x)]
+            worst = max(worst, sum(p != q for p, q in zip(pa, pb)))
+    print("trained in batches against all at once: %.2e" % worst)
+
+    params = update_gaussian_params({}, vals)
+    first, rest = split_vals(vals, 0.5)
+    batches = update_gaussian_params({}, first)
+    for k in range(0, 10):
+        batches = update_gaussian_params(batches, {cc: {1: rest[cc][1][k::10]} for cc in rest})
+    gp_worst = max(max(np.abs(params[cc]['mean'] - batches[cc]['mean']).max(),
+                       np.abs(params[cc]['covar'] - batches[cc]['covar']).max()/np.abs(params[cc]['covar']).max())
+                   for cc in params)
+    print("gaussian params in batches against all at once: %.2e" % gp_worst)
+
+    md_worst = 0
+    changed = 0
+    for cc in vals:
+        x = np.array(vals[cc][1], dtype="float64").reshape(len(vals[cc][1]), -1)
+        ind, md = reject_outliers(x)
+        expected = mahalanobis_loop(x, x.mean(axis=0), np.cov(x, rowvar=False))
+        md_worst = max(md_worst, np.abs(md - expected).max()/expected.max())
+        changed += len(set(ind.tolist()) ^ set(np.flatnonzero(1 - stats.chi2.cdf(expected, 4) < 0.05).tolist()))
+    print("outlier distances against one trace at a time: %.2e, %d traces rejected differently" % (md_worst, changed))
+    return max(worst, gp_worst, md_worst, changed)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print(__doc__[__doc__.find("Usage"):])
+        exit()
+    command, folder = sys.argv[1], sys.argv[2]
+    if command == "check":
+        sys.exit(0 if check(folder) < 1e-8 else 1)
+    cc_degree = pickle.load(open(os.path.join(folder, "cc_degree.txt"), "rb"))
+    new_vals = pickle.load(open(sys.argv[3], "rb"))
+    if command == "build":
+        models = update_degree_models(({}, {}, {}), new_vals, cc_degree)
+        vals = new_vals
+    else:
+        models = update_degree_models(load_models(folder), new_vals, cc_degree)
+        vals = merge_vals(pickle.load(open(os.path.join(folder, "vals.txt"), "rb")), new_vals)
+    save_models(folder, models)
+    with open(os.path.join(folder, "vals.txt"), "wb") as f:
+        pickle.dump(vals, f)
+    for degree in sorted(models[2].keys()):
+        print(degree, {cc: int(c) for cc, c in zip(models[2][degree].values(), models[1][degree].class_count_)})
@@ -0,0 +1,80 @@
+'''
+Converts X.pcap to X-tcp.csv and X-udp.csv with a single tshark pass.
+
+tshark dissects the capture once and prints the TCP and the UDP fields of
+every packet together, the rows are then split into the two tables with the
+same columns as before (every packet goes to the -tcp.csv, the UDP ones also
+to the -udp.csv). The time taken and the conversion throughput are printed
+at the end.
+
+Usage:
+python3 pcap2csv.py X.pcap [--mahimahi]
+--mahimahi keeps only the packets to or from the 100.64.0.x addresses, the
+only ones the bytes-in-flight analysis looks at.
+'''
+
+import os
+import sys
+import time
+import subprocess
+
+tcp_fields = ["frame.time_epoch", "frame.time_relative", "tcp.time_relative", "frame.number", "frame.len",
+              "ip.src", "tcp.srcport", "ip.dst", "tcp.dstport", "tcp.len", "tcp.seq", "tcp.ack"]
+udp_fields = ["frame.time_epoch", "frame.time_relative", "frame.number", "frame.len",
+              "ip.src", "udp.srcport", "ip.dst", "udp.dstport", "udp.length"]
+
+MAHIMAHI_FILTER = "ip.addr == 100.64.0.0/24"
+
+
+def get_command(name, mahimahi=False):
+    fields = tcp_fields + [f for f in udp_fields if f not in tcp_fields]
+    command = ["tshark", "-r", name, "-T", "fields"]
+    for f in fields:
+        command += ["-e", f]
+    command += ["-E", "header=y", "-E", "separator=,", "-E", "quote=d", "-E", "occurrence=f"]
+    if mahimahi:
+        command += ["-Y", MAHIMAHI_FILTER]
+    return command, fields
+
+
+def convert(name, mahimahi=False):
+    '''
+    Writes name-tcp.csv and name-udp.csv, returns the number of packets.
+    '''
+    command, fields = get_command(name, mahimahi)
+    tcp_index = [fields.index(f) for f in tcp_fields]
+    udp_index = [fields.index(f) for f in udp_fields]
+    udp_port = fields.index("udp.srcport")
+    count = 0
+    proc = subprocess.Popen(command, stdout=subprocess.PIPE, text=True, bufsize=1 << 20)
+    with open(name+"-tcp.csv", "w") as tcp_file, open(name+"-udp.csv", "w") as udp_file:
+        header = proc.stdout.readline()
+        if header:
+            tcp_file.write(",".join(tcp_fields)+"\n")
+            udp_file.write(",".join(udp_fields)+"\n")
+        for line in proc.stdout:
+            # the values are numbers and addresses, so they never contain a comma
+            values = line.rstrip("\n").split(",")
+            tcp_file.write(",".join([values[i] for i in tcp_index])+"\n")
+            if values[udp_port] != "":
+                udp_file.write(",".join([values[i] for i in udp_index])+"\n")
+            count += 1
+    if proc.wait() != 0:
+        raise RuntimeError("tshark failed on "+name)
+    return count
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("This scripts converts .pcap files to a more parse-able .csv format.")
+        print("To convert X.pcap to X-tcp.csv and X-udp.csv, run 'python3 pcap2csv.py X.pcap [--mahimahi]'")
+        exit()
+    mahimahi = "--mahimahi" in sys.argv
+    name = [a for a in sys.argv[1:] if a != "--mahimahi"][0]
+    print("[Converting recv data to .csv format]")
+    start = time.time()
+    count = convert(name, mahimahi)
+    taken = max(time.time() - start, 1e-9)
+    size = os.path.getsize(name)/(1024*1024)
+    print("Converted %d packets (%.1f MB) in %.2f s : %.0f packets/s, %.2f MB/s"
+          % (count, size, taken, count/taken, size/taken))
@@ -1,13 +1,9 @@
 import sys
 import json 
 
-helper = "semantics-helper.py"
-nebby_helper = "semantics-nebby-helper.py"
-
-with open(helper) as infile:
-    exec(infile.read())
-with open(nebby_helper) as infile2:
-    exec(infile2.read())
+from nebby.flows import process_flows
+from nebby.semantics import get_request_list, get_cid_rq_dict, get_cid_port_mp, get_port_rq_dict, \
+    get_port_rq_summary, print_port_http_size_type, get_http_chart
 
 file = sys.argv[1]
 path = "../logs/"
@@ -36,7 +32,7 @@ print()
 port_rq_dict = get_port_rq_dict(cid_rq_dict, cid_port_mp)
 
 print()
-flows = process_flows(file, "../measurements/")
+flows = process_flows(file, "../measurements/", p="n")
 print()
 print("RQs Ports", len(port_rq_dict.keys())-1)
 print("Netlog Ports", len(cid_port_mp.keys()))
@@ -13,29 +13,23 @@ def collect_test_data(var, present_files):
     return vals_test, new_vals_test
 
 
-from scipy.stats import multivariate_normal as mvn
+from nebby.score import GaussianScorer
 def getPDensity(curr, cc_gaussian_params):
-    prob = {}
-    for cc in cc_gaussian_params:
-        mn = cc_gaussian_params[cc]['mean']
-        covar = cc_gaussian_params[cc]['covar']
-#         print("CC being checked against",cc)
-#         print(np.linalg.det(covar))
-        curr_p = mvn.pdf(curr,mean=mn, cov=covar, allow_singular=True)
-        prob[cc]=curr_p
-    return prob
+    ccs, density = GaussianScorer(cc_gaussian_params).score([curr])[0]
+    return dict(zip(ccs, density))
 
 def get_test_accuracy(vals_test, cc_gaussian_params):
     acc_m = {}
+    # the densities of all the test coefficients of a cc are found at once
+    scorer = GaussianScorer(cc_gaussian_params)
     for cc in vals_test:
         if cc not in acc_m :
             acc_m[cc] = []
         if len(list(vals_test[cc].keys()))==0:
             continue
         data = vals_test[cc][1]
-        for curr in data:
-            p_dense = getPDensity(curr, cc_gaussian_params)
-            acc_m[cc].append(p_dense)
+        for ccs, density in scorer.score(data):
+            acc_m[cc].append(dict(zip(ccs, density)))
     top = {}
     error = {}
     for cc in acc_m :
@@ -1,625 +1,15 @@
-import csv
-import matplotlib.pyplot as plt
-import sys
-import math
-
-import matplotlib.pyplot as plt
-from scipy.fft import rfft, rfftfreq
-from scipy.fft import irfft
-import numpy as np
-import statistics
-from statistics import mean, pstdev
-import pandas as pd
-
-yellow = '\033[93m'
-green = '\033[92m'
-red = '\033[91m'
-blue = '\033[94m'
-pink = '\033[95m'
-black = '\033[90m'
-
-def smoothen(time, data, rtt):
-    # Smoothening 
-    left = 0
-    right = 0
-    run_sum = 0
-    avg_data = []
-    new_time = []
-    roll_time = time
-    roll_data = data
-    while right < len(roll_time):
-        while(right < len(roll_time) and (roll_time[right]-roll_time[left] < 2*rtt)):
-            run_sum+=roll_data[right]
-            right+=1
-        new_time.append(float(roll_time[right-1]+roll_time[left])/2)
-        avg_data.append(float(run_sum)/(right-left))
-        run_sum-=roll_data[left]
-        left+=1
-    return new_time, avg_data
-
-
-def get_fft(data):
-    n = len(data)
-    data_step = 0.002
-    yf = rfft(data)
-    xf = rfftfreq(n,data_step)
-    return yf,xf
-
-def get_fft_smoothening(data, time, ax,rtt,p):
-    rtt=rtt
-    yf, xf = get_fft(data)
-    thresh  = (1/rtt)
-    thresh_ind = 0
-    for i in range(len(xf)) :
-        freq = xf[i]
-        if(freq > thresh):
-            thresh_ind = i
-            break
-            
-    yf_clean = yf
-    yf_clean[thresh_ind+1:] = 0
-    new_f_clean = irfft(yf_clean)
-    start_len = len(time) - len(new_f_clean)
-
-    plot_data = new_f_clean
-#     if p=="y":
-#         ax.plot(time[start_len:], plot_data, 'k', label='FFT smoothening', linewidth=1.5)
-
-    plot_time = time[start_len:] 
-    return plot_time, plot_data
-
-def plot_d(ax, time, data, c, l, alpha=1):
-    ax.plot(time, data, color=c, lw=2, label = l,alpha=alpha)
-
-
-def plot_one_bt(f, p,t=1):
-    print(f)
-    file_name = f.split("/")[-1]
-    fs = file_name.split("-")
-
-    pre = int(fs[1])
-    post = int(fs[2])
-    rtt = float(((pre+post)*2))/1000
-    ax = 0
-    if t==1:
-        data, time, retrans = get_window(f,"n",t)
-    elif t==2:
-        data, time, retrans, OOA, DA = get_window(f,"n",t)
-    if p == 'y':
-        fig, ax = plt.subplots(1,1, figsize=(15,8))
-        for t in retrans :
-            plt.axvline(x = t, color = 'm',alpha=0.5)
-        if t == 2:
-            for t in OOA :
-                plt.axvline(x = t, color = 'k', lw=2)
-            for t in DA:
-                plt.axvline(x = t, color = 'g', lw=0.5, alpha = 0.5)
-        plot_d(ax,time,data, "r","Original")
-    time, data = get_fft_smoothening(data, time, ax,rtt,"y")
-
-    #         plot_d(ax,time,data,"b","FFT Smoothened" )
-#         print(len(time), len(data))
-    time, data = smoothen(time, data, rtt)
-#         print(len(time), len(data))
-    if p == 'y':
-        plot_d(ax, time, data, "b", "Smoothened",alpha=0.5)
-        ax.legend()
-#             plt.savefig("./plots/"+f+".png")
-        plt.show()
-#     return time, data, grad_time, grad_data, rtt
-#     print("Black : OOA, Green : DA, Magenta : RP")
-    return time, data, retrans, rtt 
-
-
-def get_time_features(retrans,time,rtt):
-    time_thresh = 20*rtt
-    features = []
-    for i in range(1, len(retrans)):
-        if retrans[i]-retrans[i-1] >= time_thresh:
-            features.append([retrans[i-1], retrans[i]])
-    # add a feature that finished when the experiment ends
-    if time[-1] - retrans[-1] > 20*rtt :
-        features.append([retrans[-1],time[-1]])
-    return features
-
-def get_features(time, features):
-    left = 0
-    right = 0
-    feature_index = 0
-    in_feature = 0
-    index_features = []
-    while right < len(time) and feature_index < len(features): 
-        if in_feature == 0 and time[right]>=features[feature_index][0]:
-            in_feature = 1
-            left = right
-        elif in_feature == 1 and time[right] > features[feature_index][1]:
-            in_feature = 0
-            index_features.append([left, right-1])
-            feature_index+=1
-        right+=1
-    if in_feature == 1:
-        index_features.append([left, right-1])
-    return index_features
-
-def get_plot_features(curr_file, p):
-    time, data, retrans, rtt = plot_one_bt(curr_file,p=p,t=1)
-    time_features = get_time_features(retrans,time,rtt)
-    features = get_features(time, time_features)    
-    if p == 'y':
-        fig, ax = plt.subplots(1,1, figsize=(15,8))
-        plot_d(ax, time, data, "b", "Smoothened")
-        for ft in features : 
-#             print(time[ft[1]]-time[ft[0]])
-            ax.plot(time[ft[0]:ft[1]+1], data[ft[0]:ft[1]+1], color = 'r')
-        plt.show()
-    return time, data, features
-
-
-SHOW=True
-MULTI_GRAPH=False
-SMOOTHENING=False
-ONLY_STATS=False
-s_factor=0.9
+# Usage: python3 bbr_check.py file_path [y]
+# prints whether the trace is BBR, with y it also shows the trace with the
+# probes of BBR in red (it is no longer plotted without it)
 
+import sys
 
-PKT_SIZE = 88
-
-
-'''
-TODO: 
-o Add functionality where you only plot flows that send more than x bytes of data
-o Sort stats and graphs by flow size
-o Organize plots by flow size (larger flows have larger graphs)
-o Custom smoothening function
-'''
-
-fields=["time", "frame_time_rel", "tcp_time_rel", "frame_num", "frame_len", "ip_src", "src_port", "ip_dest", "dest_port", "tcp_len", "seq", "ack"]
-
-class pkt:
-    contents=[]
-    def __init__(self, fields) -> None:
-        self.contents=[]
-        for f in fields:
-            self.contents.append(f)
-
-    def get(self, field):
-        return self.contents[fields.index(field)]
-        
-
-def process_flows(cc, dir,p="y"):
-    name = dir+cc+"-tcp.csv"
-    with open(name) as csv_file:
-        print("Reading "+name+"...")
-        csv_reader = csv.reader(csv_file, delimiter=',')
-        line_count = 0
-        total_bytes=0
-        '''
-        Flow tracking:
-        o Identify all packets that are either sourced from or headed to 100.64.0.2
-        o Group different flows by client's port
-        '''
-        flows={}
-        data_sent=0
-        # ACK and RTX measurement
-        ooa = set()
-        rp = set()
-        ooaCount=0
-        rpCount=0
-        daCount=0
-        backAck=0
-        for row in csv_reader:
-            reTx=0
-            
-            ooAck=0
-            dupAck=0
-            retPacket=0
-            
-            packet=pkt(row)
-            ackPkt=False
-            validPkt=False
-            if line_count==0:
-                # reject the header
-                line_count+=1
-                continue
-            if data_sent == 0 : 
-                if "100.64.0." in packet.get("ip_src"):
-                    num = int(packet.get("ip_src")[-1])
-                    if num%2==0:
-                        data_sent=1
-                        host_port=packet.get("ip_src")
-                if "100.64.0." in packet.get("ip_dest"):
-                    num = int(packet.get("ip_dest")[-1])
-                    if num%2==0:
-                        data_sent=1
-                        host_port=packet.get("ip_dest")
-                if data_sent == 0:
-                    continue
-            if packet.get("ip_src")==host_port and packet.get("frame_time_rel")!='' and packet.get("ack")!='': 
-                # we care about this ACK packet
-                validPkt=True
-                ackPkt=True
-                port=packet.get("src_port")
-                #PORTCHECK
-#                 if int(port) != 50468:
-#                     continue
-                if port not in flows:
-                    flows[port]={"OOA":[],"DA":[],"max_seq":0,"loss_bif":0,"max_ack":int(packet.get("ack")),"serverip":packet.get("ip_dest"), "serverport":packet.get("dest_port"), "act_times":[],"times":[], "windows":[], "cwnd":[], "bif":0, "last_ack":0, "last_seq":0, "pif":0, "drop":[], "next":0, "retrans":[]}
-                else:
-                    # check for Out of Order Ack (OOA)
-                    if int(packet.get("ack")) <= int(flows[port]["max_ack"]):
-                        if int(packet.get("ack")) == backAck :
-                            dupAck = True
-                            flows[port]["DA"].append(float(packet.get("frame_time_rel")))
-                        else :
-                            ooAck = True
-                            flows[port]["OOA"].append(float(packet.get("frame_time_rel")))
-                        backAck = int(packet.get("ack"))
-                    # update max_ack
-                    flows[port]["max_ack"] = max(flows[port]["max_ack"], int(packet.get("ack")))
-                    if int(packet.get("seq")) < flows[port]["max_ack"]:
-                        reTx += int(packet.get("tcp_len"))
-#                     flows[port]["times"].append(float(packet.get("frame_time_rel")) )
-                    
-            elif packet.get("ip_dest")==host_port and packet.get("frame_time_rel")!='' and packet.get("seq")!='':
-                #we care about this Data packet
-                validPkt=True
-                port=packet.get("dest_port")
-                #PORTCHECK
-#                 if int(port) != 50468:
-#                     continue
-                seq=int(packet.get("seq"))
-                tcp_len=int(packet.get("tcp_len"))
-                if port not in flows:
-                    flows[port]={"OOA":[],"DA":[],"max_seq":int(packet.get("seq")),"loss_bif":0,"max_ack":0,"serverip":packet.get("ip_src"), "serverport":packet.get("src_port"),"act_times":[], "times":[], "windows":[], "cwnd":[], "bif":0, "last_ack":0, "last_seq":0, "pif":0, "drop":[], "next":0, "retrans":[]}
-                
-                else:
-                    flows[port]["max_seq"] = max(flows[port]["max_seq"], int(packet.get("seq")))
-                
-                
-                if int(packet.get("seq")) < flows[port]["max_seq"] :
-                    retPacket = True
-                    flows[port]["retrans"].append(flows[port]["times"][-1])
-                    
-            if validPkt==True:
-                bif = 0
-                normal_est_bif = int(flows[port]["max_seq"]) - int(flows[port]["max_ack"]) + PKT_SIZE#+ reTx
-                loss_est_bif = flows[port]["loss_bif"]
-                if ackPkt and dupAck and len(flows[port]["windows"]) > 10:
-                    if dupAck:
-                        # if we have received a duplicate ack then we need to reduce the bytes in flight by packet size
-                        # we also increase max ack to correct for the consolidated ack being sent later
-                        loss_est_bif = int(flows[port]["windows"][-1]) - PKT_SIZE
-                        flows[port]["max_ack"] += PKT_SIZE
-                        
-                        bif = min( normal_est_bif, loss_est_bif)
-                        if p == "y" :
-                            print(green+"Duplicate Ack",int(packet.get("ack")),"Max Ack",flows[port]["max_ack"],"BIF",bif)
-                        
-#                     elif ooAck:
-#                         # first out of order ack that we have recieved not a duplicated ack
-#                         # the reason would be restransimitted packet so dont need to correct for this
-                        
-                elif ackPkt :
-                    loss_est_bif = normal_est_bif 
-                    bif = normal_est_bif    
-                    if ooAck :
-                        ooaCount+=1
-                        if p == "y":
-                            print(red+"Out of Order Ack",int(packet.get("ack")),"Max Ack",flows[port]["max_ack"],"BIF",normal_est_bif)
-                        ooa.add(int(packet.get("ack")))
-                    else:
-                        if p == "y":
-                            print(black+"Inorder Ack",int(packet.get("ack")),"Max Seq",flows[port]["max_seq"],"BIF",normal_est_bif)
-                else :
-                    bif = normal_est_bif
-                    if retPacket==True:
-                        rpCount+=1
-                        rp.add(int(packet.get("seq")))
-                        if p == "y":
-                            print(pink+"Retransmitted Packet",int(packet.get("seq")), "Next", flows[port]["max_seq"]+PKT_SIZE, "BIF",bif)
-                    else :
-                        if p == "y":
-                            print(blue+"Inorder Packet", int(packet.get("seq")), "Next", flows[port]["max_seq"]+PKT_SIZE, "BIF",bif)
-                flows[port]["loss_bif"] = loss_est_bif
-                flows[port]["windows"].append( int(bif) )
-                flows[port]["times"].append( float(packet.get("frame_time_rel")) )
-                
-#                 if ackPkt and dupAck and len(flows[port]["windows"]) > 10: # we have received atleast the first window
-# #                     if len(flows[port]["windows"]) < 2000: # print reTx in first 200 packets
-# #                         print( packet.get("ack"), flows[port]["max_ack"])
-#                     loss_est_bif = int(flows[port]["windows"][-1]) - PKT_SIZE
-#                     flows[port]["max_ack"] += PKT_SIZE
-#                     bif = min( normal_est_bif, loss_est_bif )
-#                 elif ackPkt:
-#                     loss_est_bif = normal_est_bif 
-#                     bif = normal_est_bif
-#                 else:
-#                     bif = normal_est_bif
-#                 flows[port]["loss_bif"] = loss_est_bif
-#                 flows[port]["windows"].append( int(bif) )
-            
-            
-            line_count+=1
-            total_bytes+=int(packet.get("frame_len"))
-            #print(line_count, total_bytes)
-            
-#         print("total bytes processed:", total_bytes/1000, "KBytes for", cc, "(unlimited)")
-        if p == "y":
-            print("Out of Order Acks",len(ooa),"Retransmitted Packets",len(rp))
-            print("Count Out of Order Acks",ooaCount,"Retransmitted Packets",rpCount)
-            print("OOA",ooa,"RP",rp)
-    return flows
-
-def custom_smooth_function():
-    pass
-
-def get_flow_stats(flows):
-    num=len(flows.keys())
-    print("FLOW STATISTICS: \nNumber of flows: ", num)
-    print("------------------------------------------------------------------------------")
-    print('%6s'%"port", '%15s'%"SrcIP", '%8s'%"SrcPort",  '%8s'%"duration",  '%8s'%"start",  '%8s'%"end", '%8s'%"Sent (B)", '%8s'%"Recv (B)",)
-    for k in flows.keys():
-        print('%6s'%k, '%15s'%flows[k]["serverip"], '%8s'%flows[k]["serverport"], '%8s'%str('%.2f'%(flows[k]["times"][-1]-flows[k]["times"][0])), '%8s'%str('%.2f'%flows[k]["times"][0]), '%8s'%str('%.2f'%flows[k]["times"][-1]), '%8s'%flows[k]["last_seq"], '%8s'%flows[k]["last_ack"])
-        #print("    * Flow "+str(k)+": ", flows[k]["last_ack"], " ", flows[k]["last_seq"], " bytes transfered.")
-    return num
-
-def run(files):
-    flows = {}
-    for f in files:
-        algo_cc=f
-        #Get the data for all the flows
-        print("==============================================================================")
-        print("opening trace ../measurements/"+algo_cc+".csv...")
-        flows = process_flows(algo_cc, "./Nebby/measurements-new-btl/50-200-2-60/")
-        #decide on final graph layout
-        num = get_flow_stats(flows)
-
-        if ONLY_STATS:
-            sys.exit()
-
-        if num==1:
-            MULTI_GRAPH=False
-        #grid size
-        if MULTI_GRAPH:
-            size=(0,0)
-            grids={1:(2,2), 2:(2,2), 4:(2,2), 6:(2,3), 9:(3,3), 12:(3,4), 15:(3,5), 16:(4,4), 20:(5,4), 24:(6,4), 30:(6,5), 36:(6,6), 40:(8,5), 42:(8,7), 49:(7,7)}
-            g=num
-            while g<=49 and g not in grids:
-                g+=1
-            if g in grids.keys():
-                size=grids[g]
-            else:
-                size=grids[49]  
-            fig, axs = plt.subplots(size[0], size[1])
-            for i in range(size[0]):
-                for j in range(size[1]):
-                    #axs[i][j].legend(loc="lower right")
-                    if i==size[0]-1:
-                        axs[i][j].set_xlabel("Time (s)")
-                    if j==0:
-                        axs[i][j].set_ylabel("Bytes in flight")
-        else:
-            plt.xlabel("Time (s)")
-            plt.ylabel("Bytes in flight")
-        counter=0
-        for port in flows.keys():
-            if MULTI_GRAPH:  
-                axs[counter%size[0]][(counter//size[0])%size[1]].scatter(flows[port]["times"], flows[port]["windows"], color="#858585")
-                axs[counter%size[0]][(counter//size[0])%size[1]].plot(flows[port]["times"], flows[port]["windows"], label=str(port), linestyle="solid")
-            else:
-                plt.plot(flows[port]["times"], flows[port]["windows"], label=str(port), linestyle="solid")
-                plt.scatter(flows[port]["times"], flows[port]["windows"], color="#858585")
-            counter+=1
-        if MULTI_GRAPH:
-            counter=0
-            for port in flows.keys():
-                axs[counter%size[0]][(counter//size[0])%size[1]].legend()
-                counter+=1
-        else:
-            plt.legend()
-        if MULTI_GRAPH:
-            fig.set_size_inches(16, 12)
-        if SHOW:
-            plt.show()
-        else:
-            plt.savefig("../logs/results/"+algo_cc+".png", dpi=600, bbox_inches='tight', pad_inches=0)
-    return flows
-
-
-def get_window(f,p,t=1):
-    path = f.split("/")
-    file_name = path[-1][:-8]
-    folder_path = "/".join(path[:-1])
-    folder_path = folder_path + "/"
-    algo_cc = file_name
-
-    flows = process_flows(algo_cc, folder_path,p=p)
-#     flows = process_flows(algo_cc, "../measurements/m/",p=p)
-#     flows = process_flows(algo_cc, "./Nebby/measurements/",p=p)    
-#     flows = process_flows(algo_cc, "./Nebby/measurements-new-btl/50-200-2-60/",p=p)
-#     flows = process_flows(algo_cc, "./Nebby/measurements-100-150/",p=p)
-    params = algo_cc.split("-")
-    data = []
-    time = []
-    drops = []
-    retrans = []
-    OOA = []
-    DA = []
-    use_port = 0
-    maxx = 0
-    print("All Ports : ", flows.keys())
-    for port in flows.keys():
-        if len(flows[port]['windows']) > maxx:
-            maxx = len(flows[port]['windows'])
-            use_port = port
-    print("Port",use_port)
-    data = flows[use_port]['windows']
-    time = flows[use_port]['times']
-    retrans = flows[use_port]['retrans']
-    OOA = flows[use_port]['OOA']
-    DA = flows[use_port]['DA']
-    if p == "y":
-        plt.plot(time, data)
-#     time_index = len(time)-1
-#     for index in range(len(flows[use_port]['times'])-1):
-#         if flows[use_port]['times'][index+1] - flows[use_port]['times'][index] > :
-#             time_index = index
-#     time_last = flows[use_port]['times'][time_index]
-#     data = data[:time_index+1]
-#     time = time[:time_index+1]
-    if t==2:
-        return data, time, retrans, OOA, DA
-    if t==1:
-        return data, time, retrans
-
-
-def getProbes(time, data, rtt, bdp, bw=200):
-    if bw==200:
-        thresh = 8*rtt
-        st_thresh = 0.025
-        error = 0.08
-        alpha = 1.10
-    if bw==1000:
-        thresh = 4*rtt
-        st_thresh = 0.025
-        error = 0.02
-        alpha = 1
-    probe_index = []
-    left = 0
-    right = 0
-    bdp_thresh = bdp/2
-    prev_right = 0
-    end = 0
-    while right < len(data):
-        while right < len(data) and (time[right]-time[left]) < thresh:
-            right+=1
-        if right == len(data):
-            end = 1
-            right-=1
-        mid = math.floor(left + (right - left)/2)
-        mid_val = 0
-        left_mid = mid
-        right_mid = mid
-#         print(left,right)
-#         while left_mid > 0 and abs(time[mid]-time[left_mid])<rtt:
-#             if data[left_mid] > data[left] and data[left_mid] > data[right]:
-#                 mid_val+=1
-#             left_mid-=1
-#         while right_mid < len(data)-1 and abs(time[right_mid]-time[mid])<rtt:
-#             if data[right_mid] > data[left] and data[right_mid] > data[right]:
-#                 mid_val+=1
-#             right_mid+=1
-#         total = right_mid - left_mid
-#         peak = 0
-#         if round(float(mid_val)/total,2) > 0.99 :
-#             print(round(float(mid_val)/total,2))
-#             peak=1
-        go = 0
-        if data[mid] > data[left] and data[mid] > data[right]:
-#         if peak == 1:
-            #this  is  peak
-#             go = 1
-            t_l = left
-            t_r = right
-            while(t_l > 0 and time[left]-time[t_l] < thresh/2):
-                t_l-=1
-            while(t_r < len(data)-1 and time[t_r]-time[right] < thresh/2):
-                t_r+=1
-            left_sd = round(np.std(data[t_l:left])/(bdp_thresh*2),3)
-            right_sd = round(np.std(data[right:t_r])/(bdp_thresh*2),3)
-            if float(abs(data[left]-data[right]))/data[left] < error:
-                # this has the left and right points not too different from each other
-                side_avg = float((data[left]+data[right]))/2
-                local_max = max(data[left:right+1])
-#                 go = 1
-#                 print("Yes")
-                if float(local_max)/side_avg > alpha and local_max > bdp_thresh: 
-                    # this means that the peak is quite steep
-#                     print("This")
-#                     go = 1
-                    if (left_sd < st_thresh) and (right_sd < st_thresh):
-                        # this means that the lest and right are quite stable respectvely
-                        go = 1
-#                         print("Out", left_sd, right_sd, st_thresh)
-        if go == 1: 
-            try :
-                probe_index.append([left,right,float(local_max)/side_avg, time[right]-time[left], left_sd, right_sd, t_l,t_r])
-            except :
-                probe_index.append([left,right])
-            #Once you have found something you directly move past it
-            left = right-1
-        if end:
-            right+=1
-        left+=1
-    return probe_index
-
-
-def checkBBR(files):
-    classi = []
-    for f in files:
-        file_name = f.split("/")[-1]
-        para = file_name.split("-")
-        rtt = int(para[2])*2
-        bw = int(para[3])
-        bf = int(para[4])
-        bdp = float(bw*rtt*bf)/8
-        if bw == 1000 :
-            l=5
-            r=15
-        if bw == 200:
-            l=10
-            r=20
-        try:
-            time, data, retrans,rtt = plot_one_bt(f,p="n",t=1)
-            probe_index = getProbes(time, data, rtt, bdp, bw)
-            print_red(time, data, probe_index)
-            prev = 0
-            time_dis = []
-            for p in probe_index:
-                curr_ind = data.index(max(data[p[0]:p[1]+1]))
-                if curr_ind > p[1] or curr_ind < p[0]:
-                    print("Something Wrong")
-                if prev != 0:
-                    time_dis.append(abs(time[curr_ind]-prev))
-                prev = time[curr_ind]
-#             print(time_dis)
-            count = 0
-            isBBR = 0
-            for t in time_dis : 
-                if  t > l*rtt and t < r*rtt :
-                    count+=1
-                    if count >= 2: # there are three peaks consecutively
-                        isBBR=1
-                        break
-                else:
-                    count = 0
-            if isBBR:
-                classi.append("YES BBR")
-            else:
-                if len(probe_index) <= 1 :
-                    classi.append("NO BBR")
-                else:
-                    classi.append("MAYBE BBR")
-        except Exception as ex:  
-            template = "An exception of type {0} occurred. Arguments:\n{1!r}"
-            message = template.format(type(ex).__name__, ex.args)
-            new_message = "NC " + message
-            classi.append(new_message)
-    return classi
-
-def print_red(time,data,probe_index):
-    fig, ax = plt.subplots(1,1, figsize=(15,8))
-    offset=0
-    ax.plot(time[offset:],data[offset:])
-    # for t in retrans :
-    #     if t > time[offset]:
-    #         plt.axvline(x = t, color = 'm',alpha=0.5)
-    # ax.plot(new_time[offset:], new_data[offset:])
-    for p in probe_index:
-        ax.plot(time[p[0]:p[1]+1], data[p[0]:p[1]+1], color='r', lw=2)
-    plt.show()
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from nebby.pipeline import checkBBR
 
 file=sys.argv[1]
+p = sys.argv[2] if len(sys.argv) > 2 else "n"
 
-classi = checkBBR([file])
-print(file, "is", classi[0])
\ No newline at end of file
+classi = checkBBR([file], p)
+print(file, "is", classi[0])
@@ -14,11 +14,18 @@ client_type=${8:-"wget"}  # Default client type
 
 # Run the simulation with appropriate client type
 ./simnet.sh $cc $predelay $postdelay $linkspeed $buffsize $file $duration $client_type
-../analysis/pcap2csv.sh test.pcap
 
-# Copy results to measurements directory
-cp test.pcap-tcp.csv ../measurements/$cc-tcp.csv
-cp test.pcap-udp.csv ../measurements/$cc-udp.csv
+# With NEBBY_PCAP set the capture is kept as is, the analysis reads
+# $cc.pcap directly when there is no $cc-tcp.csv (chrome runs still need the csv)
+if [ -n "$NEBBY_PCAP" ] && [ "$client_type" != "chrome" ]; then
+    cp test.pcap ../measurements/$cc.pcap
+else
+    ../analysis/pcap2csv.sh test.pcap
+
+    # Copy results to measurements directory
+    cp test.pcap-tcp.csv ../measurements/$cc-tcp.csv
+    cp test.pcap-udp.csv ../measurements/$cc-udp.csv
+fi
 
 # If Chrome was used, copy the network log
 if [ "$client_type" == "chrome" ]; then